@@ -7,6 +7,7 @@ import pandas as pd
 import os
 from datetime import datetime, date, timedelta
 import sqlite3
+import asyncio
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -409,7 +410,6 @@ def trigger_ai_analysis():
         
         if use_async:
             # 使用异步处理
-            import asyncio
             processed_count = asyncio.run(
                 ai_analyzer.analyze_unprocessed_policies_async(
                     limit=limit, 
@@ -715,10 +715,6 @@ register_event_routes(app)
 def fetch_policy_data():
     """获取最新政策数据"""
     try:
-        # 添加logging导入（如果还没有的话）
-        import logging
-        logger = logging.getLogger(__name__)
-        
         # 创建政策数据获取器实例
         policy_fetcher = PolicyDataFetcher(EVENTS_DB_FILE)
         
@@ -734,9 +730,6 @@ def fetch_policy_data():
         })
         
     except Exception as e:
-        # 添加更详细的错误日志
-        import logging
-        logger = logging.getLogger(__name__)
         logger.error(f"获取政策数据时出错: {e}")
         return jsonify({
             'success': False,
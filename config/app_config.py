@@ -23,14 +23,15 @@ class AppConfig:
             env_file = os.path.join(project_root, '.env')
             
             if os.path.exists(env_file):
+                # 一次性读入后按行解析，partition比split+边界检查更轻量
                 with open(env_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#') and '=' in line:
-                            key, value = line.split('=', 1)
-                            # 只有当环境变量不存在时才设置（避免覆盖系统环境变量）
-                            if key.strip() not in os.environ:
-                                os.environ[key.strip()] = value.strip()
+                    content = f.read()
+                for line in content.splitlines():
+                    if not line or line.lstrip().startswith('#') or '=' not in line:
+                        continue
+                    key, _, value = line.partition('=')
+                    # setdefault：只有当环境变量不存在时才设置（避免覆盖系统环境变量）
+                    os.environ.setdefault(key.strip(), value.strip())
                 print(f"已加载配置文件: {env_file}")
             else:
                 print(f"警告：未找到.env文件: {env_file}")
@@ -9,24 +9,83 @@ import sqlite3
 import json
 import os
 import time
+import asyncio
 from datetime import datetime
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'tools'))
 from fix_policy_dates import PolicyDateFixer
+import atexit
 import logging
+import logging.handlers
+import aiohttp
 import requests
+try:
+    # 可选依赖：装了requests-cache时重复URL直接走磁盘缓存
+    import requests_cache
+except ImportError:
+    requests_cache = None
 from bs4 import BeautifulSoup
 import re
 from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 
+# 并发抓取的上限：整体受信号量约束，避免对源站造成压力
+_FETCH_CONCURRENCY = 16
+# 每秒最多发起的请求数（滑动窗口限流）
+_FETCH_RATE_PER_SEC = 20
+
+# 每多少个批量检查点真正落盘一次进度文件
+_PROGRESS_SAVE_INTERVAL = 4
+
+# 网页中常见的发布日期格式：2024-01-15 / 2024/1/15 / 2024年1月15日
+_PUBLISH_DATE_PATTERN = re.compile(r'(20\d{2})[-/年](\d{1,2})[-/月](\d{1,2})')
+
+# 同步和异步抓取共用的请求头
+_HTTP_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                   'AppleWebKit/537.36 (KHTML, like Gecko) '
+                   'Chrome/120.0.0.0 Safari/537.36')
+}
+
+
+class _AsyncRateLimiter:
+    """滑动窗口限流器，与ai_policy_analyzer中RateLimiter相同的节流思路"""
+
+    def __init__(self, max_requests, time_window=1.0):
+        self.max_requests = max_requests
+        self.time_window = time_window
+        self.requests = []
+        self._lock = asyncio.Lock()
+
+    async def wait_if_needed(self):
+        async with self._lock:
+            now = time.time()
+            self.requests = [t for t in self.requests if now - t < self.time_window]
+            if len(self.requests) >= self.max_requests:
+                wait_time = self.time_window - (now - self.requests[0])
+                if wait_time > 0:
+                    await asyncio.sleep(wait_time)
+            self.requests.append(time.time())
+
 # 配置日志
+_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 逐URL的日志量很大，文件写入经MemoryHandler缓冲批量落盘，
+# ERROR及以上立即刷出，进程退出时由atexit收尾
+_file_handler = logging.FileHandler('batch_fix_dates.log', encoding='utf-8')
+_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+_buffered_handler = logging.handlers.MemoryHandler(
+    capacity=1024, flushLevel=logging.ERROR, target=_file_handler
+)
+atexit.register(_buffered_handler.close)
+
 logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    format=_LOG_FORMAT,
     handlers=[
-        logging.FileHandler('batch_fix_dates.log', encoding='utf-8'),
+        _buffered_handler,
         logging.StreamHandler()
     ]
 )
@@ -37,6 +96,25 @@ class BatchPolicyDateFixer(PolicyDateFixer):
         super().__init__(db_path)
         self.progress_file = progress_file
         self.progress = self.load_progress()
+        self._batches_since_save = 0
+        # 同步抓取路径复用keep-alive连接，省掉逐URL的DNS+TCP+TLS握手；
+        # 异步路径则在每批内复用同一个aiohttp.ClientSession。
+        # 装了requests-cache时响应落盘缓存30天：断点续跑或部分失败重跑时
+        # 同一URL不再走网络
+        if requests_cache is not None:
+            self.session = requests_cache.CachedSession(
+                cache_name='.date_fix_cache', backend='sqlite',
+                expire_after=2592000
+            )
+        else:
+            self.session = requests.Session()
+        self.session.headers.update(_HTTP_HEADERS)
+
+    def extract_publish_date_from_url(self, source_url, title=None):
+        """同步提取发布日期，走复用的Session而不是模块级requests.get"""
+        response = self.session.get(source_url, timeout=10)
+        response.raise_for_status()
+        return self._parse_publish_date_from_html(response.text)
     
     @contextmanager
     def get_db_connection(self):
@@ -72,11 +150,23 @@ class BatchPolicyDateFixer(PolicyDateFixer):
             'last_update_time': None
         }
     
-    def save_progress(self):
-        """保存进度信息"""
+    def save_progress(self, force=False):
+        """保存进度信息
+
+        先写临时文件再os.replace原子替换，崩溃时不会留下半个JSON；
+        常规检查点每_PROGRESS_SAVE_INTERVAL次才真正落盘一次，
+        force=True（收尾时）立即写入。
+        """
+        self._batches_since_save += 1
+        if not force and self._batches_since_save < _PROGRESS_SAVE_INTERVAL:
+            return
+        self._batches_since_save = 0
+
         try:
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
+            tmp_path = self.progress_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(self.progress, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.progress_file)
         except Exception as e:
             logger.error(f"保存进度文件失败: {e}")
     
@@ -94,132 +184,245 @@ class BatchPolicyDateFixer(PolicyDateFixer):
             total = cursor.fetchone()[0]
             return total
     
+    async def extract_publish_date_async(self, session, source_url, title=None):
+        """extract_publish_date_from_url的异步版本，改用aiohttp抓取页面"""
+        async with session.get(source_url) as response:
+            response.raise_for_status()
+            html = await response.text(errors='replace')
+        return self._parse_publish_date_from_html(html)
+
+    def _parse_publish_date_from_html(self, html):
+        """从页面HTML中解析发布日期，返回YYYY-MM-DD或None"""
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # 优先读meta中声明的发布时间
+        for meta_name in ('PubDate', 'publishdate', 'pubdate', 'firstpublishedtime'):
+            meta = soup.find('meta', attrs={'name': meta_name})
+            if meta and meta.get('content'):
+                match = _PUBLISH_DATE_PATTERN.search(meta['content'])
+                if match:
+                    year, month, day = match.groups()
+                    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+        # 退而求其次，在正文文本中找第一个日期
+        match = _PUBLISH_DATE_PATTERN.search(soup.get_text())
+        if match:
+            year, month, day = match.groups()
+            return f"{year}-{int(month):02d}-{int(day):02d}"
+        return None
+
+    async def _process_batch_async(self, records):
+        """并发抓取整批记录的真实发布日期
+
+        返回与records顺序一致的[(record_id, real_date, error), ...]，
+        单条抓取失败不影响其他记录。
+        """
+        semaphore = asyncio.Semaphore(_FETCH_CONCURRENCY)
+        limiter = _AsyncRateLimiter(_FETCH_RATE_PER_SEC)
+        timeout = aiohttp.ClientTimeout(total=30, connect=10)
+
+        async with aiohttp.ClientSession(timeout=timeout, headers=_HTTP_HEADERS) as session:
+            async def fetch_one(record_id, title, source_url):
+                async with semaphore:
+                    await limiter.wait_if_needed()
+                    try:
+                        real_date = await self.extract_publish_date_async(
+                            session, source_url, title)
+                        return record_id, real_date, None
+                    except Exception as e:
+                        return record_id, None, e
+
+            tasks = [
+                fetch_one(record['id'], record['title'], record['source_url'])
+                for record in records
+            ]
+            return await asyncio.gather(*tasks)
+
+    def _process_batch_threaded(self, records):
+        """线程池版并发抓取，返回格式与_process_batch_async一致
+
+        requests在等待网络时释放GIL，16个工作线程即可吃满网络等待；
+        供已有事件循环在运行、无法asyncio.run的调用环境兜底使用。
+        所有SQL写入仍留在主线程。
+        """
+        def fetch_one(record):
+            try:
+                real_date = self.extract_publish_date_from_url(
+                    record['source_url'], record['title'])
+                return record['id'], real_date, None
+            except Exception as e:
+                return record['id'], None, e
+
+        with ThreadPoolExecutor(max_workers=_FETCH_CONCURRENCY) as executor:
+            return list(executor.map(fetch_one, records, chunksize=8))
+
     def fix_all_policy_dates_with_resume(self, batch_size=50, max_errors=10):
         """批量修正所有政策日期，支持断点续传
-        
+
+        按batch_size分块推进，每块内用aiohttp并发抓取（原先是串行请求
+        加time.sleep(0.3)，整个循环都耗在网络等待上），抓完即写库、
+        提交并保存进度，再取下一块。
+
         Args:
             batch_size: 批处理大小
             max_errors: 最大连续错误数，超过则停止
         """
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            
+
             try:
-            # 获取总记录数
-            total_records = self.get_total_records()
-            
-            # 设置开始时间
-            if not self.progress['start_time']:
-                self.progress['start_time'] = datetime.now().isoformat()
-            
-            logger.info(f"开始批量修正政策日期")
-            logger.info(f"总记录数: {total_records}")
-            logger.info(f"上次处理到ID: {self.progress['last_processed_id']}")
-            logger.info(f"已更新: {self.progress['total_updated']} 条")
-            logger.info(f"已跳过: {self.progress['total_skipped']} 条")
-            logger.info(f"错误数: {self.progress['total_errors']} 条")
-            
-            # 获取需要处理的记录（从上次停止的地方继续）
-            cursor.execute('''
-                SELECT id, title, source_url, date 
-                FROM policy_events 
-                WHERE source_url IS NOT NULL AND source_url != ''
-                AND id > ?
-                ORDER BY id
-            ''', (self.progress['last_processed_id'],))
-            
-            records = cursor.fetchall()
-            remaining_records = len(records)
-            
-            logger.info(f"剩余待处理: {remaining_records} 条")
-            
-            if remaining_records == 0:
-                logger.info("所有记录已处理完成！")
-                return
-            
-            consecutive_errors = 0
-            
-            for i, (record_id, title, source_url, current_date) in enumerate(records, 1):
+                # 获取总记录数
+                total_records = self.get_total_records()
+
+                # 设置开始时间
+                if not self.progress['start_time']:
+                    self.progress['start_time'] = datetime.now().isoformat()
+
+                logger.info(f"开始批量修正政策日期")
+                logger.info(f"总记录数: {total_records}")
+                logger.info(f"上次处理到ID: {self.progress['last_processed_id']}")
+                logger.info(f"已更新: {self.progress['total_updated']} 条")
+                logger.info(f"已跳过: {self.progress['total_skipped']} 条")
+                logger.info(f"错误数: {self.progress['total_errors']} 条")
+
+                # 获取需要处理的记录（从上次停止的地方继续）
+                cursor.execute('''
+                    SELECT id, title, source_url, date
+                    FROM policy_events
+                    WHERE source_url IS NOT NULL AND source_url != ''
+                    AND id > ?
+                    ORDER BY id
+                ''', (self.progress['last_processed_id'],))
+
+                records = cursor.fetchall()
+                remaining_records = len(records)
+
+                logger.info(f"剩余待处理: {remaining_records} 条")
+
+                if remaining_records == 0:
+                    logger.info("所有记录已处理完成！")
+                    return
+
+                consecutive_errors = 0
+                # 本块的更新用executemany一次写入，减少逐条execute开销
+                pending_updates = []
+                # asyncio.run失败（当前线程已有事件循环）后整轮改走线程池
+                use_threaded = False
+                stop_requested = False
+                i = 0
+
+                def _flush_updates(force=False):
+                    if pending_updates:
+                        cursor.executemany(
+                            "UPDATE policy_events SET date = ? WHERE id = ?",
+                            pending_updates
+                        )
+                        pending_updates.clear()
+                    conn.commit()
+                    self.save_progress(force=force)
+
                 try:
-                    processed_count = self.progress['total_updated'] + self.progress['total_skipped'] + i
-                    logger.info(f"处理第 {processed_count}/{total_records} 条 (ID:{record_id}): {title[:50]}...")
-                    
-                    # 提取真实发布日期
-                    real_date = self.extract_publish_date_from_url(source_url, title)
-                    
-                    if real_date and real_date != current_date:
-                        # 更新数据库
-                        cursor.execute('''
-                            UPDATE policy_events 
-                            SET date = ? 
-                            WHERE id = ?
-                        ''', (real_date, record_id))
-                        
-                        logger.info(f"  ✓ 更新日期: {current_date} -> {real_date}")
-                        self.updated_count += 1
-                        self.progress['total_updated'] += 1
-                        
-                    elif real_date:
-                        logger.debug(f"  - 日期无需更新: {current_date}")
-                        self.skipped_count += 1
-                        self.progress['total_skipped'] += 1
-                        
-                    else:
-                        logger.warning(f"  ✗ 无法提取日期，跳过: {source_url}")
-                        self.skipped_count += 1
-                        self.progress['total_skipped'] += 1
-                    
-                    # 更新进度
-                    self.progress['last_processed_id'] = record_id
-                    self.progress['last_update_time'] = datetime.now().isoformat()
-                    
-                    # 重置连续错误计数
-                    consecutive_errors = 0
-                    
-                    # 批量提交和保存进度
-                    if i % batch_size == 0:
-                        conn.commit()
-                        self.save_progress()
-                        logger.info(f"已处理 {processed_count} 条记录，已更新 {self.progress['total_updated']} 条")
-                    
-                    # 避免请求过快
-                    time.sleep(0.3)
-                    
-                except Exception as e:
-                    logger.error(f"处理记录 {record_id} 时出错: {e}")
-                    self.error_count += 1
-                    self.progress['total_errors'] += 1
-                    consecutive_errors += 1
-                    
-                    # 如果连续错误过多，停止处理
-                    if consecutive_errors >= max_errors:
-                        logger.error(f"连续错误达到 {max_errors} 次，停止处理")
-                        break
-                    
-                    continue
-            
-            # 最终提交和保存进度
-            conn.commit()
-            self.save_progress()
-            
-            logger.info(f"批量日期修正完成！")
-            logger.info(f"本次处理: {remaining_records} 条")
-            logger.info(f"总计更新: {self.progress['total_updated']} 条")
-            logger.info(f"总计跳过: {self.progress['total_skipped']} 条")
-            logger.info(f"总计错误: {self.progress['total_errors']} 条")
-            
-            # 检查是否全部完成
-            remaining = self.get_total_records() - (self.progress['total_updated'] + self.progress['total_skipped'])
-            if remaining <= 0:
-                logger.info("🎉 所有政策日期修正完成！")
-                # 可以选择删除进度文件
-                # os.remove(self.progress_file)
-            else:
-                logger.info(f"还有 {remaining} 条记录待处理，可以重新运行脚本继续")
-            
+                    # 按batch_size分块推进：抓完一块立刻写库、提交、保存进度，
+                    # 在途工作始终只有一块，任意时刻中断最多重做当前块，
+                    # 断点续传粒度不随剩余记录数膨胀
+                    for chunk_start in range(0, remaining_records, batch_size):
+                        chunk = records[chunk_start:chunk_start + batch_size]
+
+                        # 并发抓取本块URL的真实发布日期
+                        if use_threaded:
+                            results = self._process_batch_threaded(chunk)
+                        else:
+                            try:
+                                results = asyncio.run(self._process_batch_async(chunk))
+                            except RuntimeError:
+                                # 当前线程已有事件循环（如从异步Web环境调用）时
+                                # 退回线程池并发
+                                use_threaded = True
+                                results = self._process_batch_threaded(chunk)
+                        dates_by_id = {
+                            record_id: (real_date, error)
+                            for record_id, real_date, error in results
+                        }
+
+                        for record in chunk:
+                            i += 1
+                            record_id = record['id']
+                            title = record['title']
+                            source_url = record['source_url']
+                            current_date = record['date']
+                            real_date, fetch_error = dates_by_id[record_id]
+
+                            processed_count = self.progress['total_updated'] + self.progress['total_skipped'] + i
+                            logger.info(f"处理第 {processed_count}/{total_records} 条 (ID:{record_id}): {title[:50]}...")
+
+                            if fetch_error is not None:
+                                logger.error(f"处理记录 {record_id} 时出错: {fetch_error}")
+                                self.error_count += 1
+                                self.progress['total_errors'] += 1
+                                consecutive_errors += 1
+
+                                # 如果连续错误过多，停止处理
+                                if consecutive_errors >= max_errors:
+                                    logger.error(f"连续错误达到 {max_errors} 次，停止处理")
+                                    stop_requested = True
+                                    break
+                                continue
+
+                            if real_date and real_date != current_date:
+                                # 更新数据库（批量缓冲，本块结束统一冲刷）
+                                pending_updates.append((real_date, record_id))
+
+                                logger.info(f"  ✓ 更新日期: {current_date} -> {real_date}")
+                                self.updated_count += 1
+                                self.progress['total_updated'] += 1
+
+                            elif real_date:
+                                logger.debug(f"  - 日期无需更新: {current_date}")
+                                self.skipped_count += 1
+                                self.progress['total_skipped'] += 1
+
+                            else:
+                                logger.warning(f"  ✗ 无法提取日期，跳过: {source_url}")
+                                self.skipped_count += 1
+                                self.progress['total_skipped'] += 1
+
+                            # 更新进度
+                            self.progress['last_processed_id'] = record_id
+                            self.progress['last_update_time'] = datetime.now().isoformat()
+
+                            # 重置连续错误计数
+                            consecutive_errors = 0
+
+                        # 本块处理完成，批量提交和保存进度
+                        _flush_updates()
+                        logger.info(f"已处理 {self.progress['total_updated'] + self.progress['total_skipped']} 条记录，已更新 {self.progress['total_updated']} 条")
+
+                        if stop_requested:
+                            break
+
+                finally:
+                    # 无论写回阶段是否中途抛错，已缓冲的更新都提交、进度都落盘，
+                    # 重跑时从last_processed_id继续
+                    _flush_updates(force=True)
+
+                logger.info(f"批量日期修正完成！")
+                logger.info(f"本次处理: {remaining_records} 条")
+                logger.info(f"总计更新: {self.progress['total_updated']} 条")
+                logger.info(f"总计跳过: {self.progress['total_skipped']} 条")
+                logger.info(f"总计错误: {self.progress['total_errors']} 条")
+
+                # 检查是否全部完成
+                remaining = self.get_total_records() - (self.progress['total_updated'] + self.progress['total_skipped'])
+                if remaining <= 0:
+                    logger.info("🎉 所有政策日期修正完成！")
+                    # 可以选择删除进度文件
+                    # os.remove(self.progress_file)
+                else:
+                    logger.info(f"还有 {remaining} 条记录待处理，可以重新运行脚本继续")
+
             except Exception as e:
+                # 已缓冲的工作在finally里提交过，这里只记录并上抛
                 logger.error(f"批量修正日期时出错: {e}")
-                conn.rollback()
                 raise
     
     def reset_progress(self):
@@ -6,6 +6,6 @@
 - 数据质量分析
 """
 
-from .data_statistics import get_data_statistics, get_events_with_details
+from .data_statistics import get_data_statistics, get_events_with_details, iter_events_with_details
 
-__all__ = ['get_data_statistics', 'get_events_with_details']
\ No newline at end of file
+__all__ = ['get_data_statistics', 'get_events_with_details', 'iter_events_with_details']
\ No newline at end of file
@@ -3,27 +3,81 @@
 提供数据库统计信息和事件数据查询功能
 """
 
+import atexit
 import sqlite3
 import json
-from datetime import datetime
+import threading
 from contextlib import contextmanager
 
+try:
+    # 可选依赖：orjson是C实现，小字符串解析快3-5倍
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# 事件类型的中文显示名（旧events表只用到前三种）
+_TYPE_DISPLAY = {
+    'custom': '自定义',
+    'policy': '政策',
+    'economic': '经济',
+    'regulation': '法规',
+    'notice': '通知',
+    'announcement': '公告'
+}
+
+
+# 每线程复用的长连接：SQLite按连接缓存编译好的语句（cached_statements），
+# 本模块的统计SQL每次调用都相同，复用连接即可跳过重复的VDBE编译，
+# 页缓存也不必在每次请求时从零填充
+_thread_local = threading.local()
+_open_connections = []
+_open_connections_lock = threading.Lock()
+
+
+def _get_cached_connection(db_file):
+    """获取当前线程的长生命周期只读连接（按数据库文件缓存）"""
+    conns = getattr(_thread_local, 'conns', None)
+    if conns is None:
+        conns = _thread_local.conns = {}
+    conn = conns.get(db_file)
+    if conn is None:
+        conn = sqlite3.connect(db_file, cached_statements=256)
+        # 统计查询是整表聚合扫描，放大页缓存并用mmap直接映射数据文件；
+        # 临时B树（DISTINCT/GROUP BY）放内存。本模块只读，query_only兜底
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-200000')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA query_only=1')
+        conns[db_file] = conn
+        with _open_connections_lock:
+            _open_connections.append(conn)
+    return conn
+
+
+@atexit.register
+def _close_cached_connections():
+    with _open_connections_lock:
+        for conn in _open_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _open_connections.clear()
+
 
 @contextmanager
 def get_db_connection(db_file):
     """数据库连接上下文管理器
-    
+
     Args:
         db_file (str): 数据库文件路径
-        
+
     Yields:
-        sqlite3.Connection: 数据库连接对象
+        sqlite3.Connection: 数据库连接对象（线程内复用，退出时不关闭）
     """
-    conn = sqlite3.connect(db_file)
-    try:
-        yield conn
-    finally:
-        conn.close()
+    yield _get_cached_connection(db_file)
 
 
 def get_data_statistics(events_db_file):
@@ -40,43 +94,36 @@ def get_data_statistics(events_db_file):
         
         # 首先尝试从新的政策数据表获取统计
         try:
-            cursor.execute('SELECT COUNT(*) FROM policy_events')
-            total_events = cursor.fetchone()[0]
-            
+            # 总数、类型数、日期范围、不同日期数在一次全表扫描里取齐，
+            # 不必让SQLite把表翻四遍；日期跨度直接用julianday在C层算好，
+            # Python侧不再strptime往返
+            cursor.execute('''
+                SELECT COUNT(*), COUNT(DISTINCT event_type),
+                       MIN(date), MAX(date), COUNT(DISTINCT date),
+                       CAST(julianday(MAX(date)) - julianday(MIN(date)) AS INT)
+                FROM policy_events
+            ''')
+            (total_events, event_types_count, min_date, max_date,
+             unique_dates, span_days) = cursor.fetchone()
+            date_range = (min_date, max_date)
+
             if total_events > 0:
-                cursor.execute('SELECT COUNT(DISTINCT event_type) FROM policy_events')
-                event_types_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT MIN(date), MAX(date) FROM policy_events')
-                date_range = cursor.fetchone()
-                
                 # 计算日期跨度
                 date_range_days = 0
                 latest_event_date = '无数据'
-                if date_range[0] and date_range[1]:
-                    start_date = datetime.strptime(date_range[0], '%Y-%m-%d')
-                    end_date = datetime.strptime(date_range[1], '%Y-%m-%d')
-                    date_range_days = (end_date - start_date).days
-                    latest_event_date = date_range[1]
+                if min_date and max_date:
+                    date_range_days = span_days
+                    latest_event_date = max_date
                 
-                # 事件类型统计
-                cursor.execute('SELECT event_type, COUNT(*) as count FROM policy_events GROUP BY event_type ORDER BY count DESC')
+                # 事件类型统计：每类的数量和最新日期在同一次GROUP BY里取出，
+                # 避免每个类型再发一条MAX(date)查询
+                cursor.execute('SELECT event_type, COUNT(*) as count, MAX(date) FROM policy_events GROUP BY event_type ORDER BY count DESC')
                 type_stats_raw = cursor.fetchall()
-                
+
                 event_type_stats = []
-                for event_type, count in type_stats_raw:
-                    cursor.execute('SELECT MAX(date) FROM policy_events WHERE event_type = ?', (event_type,))
-                    latest_date = cursor.fetchone()[0]
-                    
-                    type_display = {
-                        'custom': '自定义',
-                        'policy': '政策',
-                        'economic': '经济',
-                        'regulation': '法规',
-                        'notice': '通知',
-                        'announcement': '公告'
-                    }.get(event_type, event_type)
-                    
+                for event_type, count, latest_date in type_stats_raw:
+                    type_display = _TYPE_DISPLAY.get(event_type, event_type)
+
                     event_type_stats.append({
                         'type': event_type,
                         'type_display': type_display,
@@ -85,10 +132,7 @@ def get_data_statistics(events_db_file):
                         'latest_date': latest_date or '无'
                     })
                 
-                # 数据质量分析
-                cursor.execute('SELECT COUNT(DISTINCT date) FROM policy_events')
-                unique_dates = cursor.fetchone()[0]
-                
+                # 数据质量分析（单日最大事件数需要GROUP BY，单独查询）
                 cursor.execute('SELECT date, COUNT(*) as daily_count FROM policy_events GROUP BY date ORDER BY daily_count DESC LIMIT 1')
                 max_events_result = cursor.fetchone()
                 max_events_per_day = max_events_result[1] if max_events_result else 0
@@ -129,40 +173,32 @@ def get_data_statistics(events_db_file):
             # 如果政策数据表不存在，回退到旧表
             pass
         
-        # 回退到旧的events表统计
-        cursor.execute('SELECT COUNT(*) FROM events')
-        total_events = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(DISTINCT event_type) FROM events')
-        event_types_count = cursor.fetchone()[0]
-         
-        cursor.execute('SELECT MIN(date), MAX(date) FROM events')
-        date_range = cursor.fetchone()
-        
+        # 回退到旧的events表统计（聚合同样合并成一次扫描，跨度在SQL里算）
+        cursor.execute('''
+            SELECT COUNT(*), COUNT(DISTINCT event_type),
+                   MIN(date), MAX(date), COUNT(DISTINCT date),
+                   CAST(julianday(MAX(date)) - julianday(MIN(date)) AS INT)
+            FROM events
+        ''')
+        (total_events, event_types_count, min_date, max_date,
+         unique_dates, span_days) = cursor.fetchone()
+        date_range = (min_date, max_date)
+
         # 计算日期跨度
         date_range_days = 0
         latest_event_date = '无数据'
-        if date_range[0] and date_range[1]:
-            start_date = datetime.strptime(date_range[0], '%Y-%m-%d')
-            end_date = datetime.strptime(date_range[1], '%Y-%m-%d')
-            date_range_days = (end_date - start_date).days
-            latest_event_date = date_range[1]
+        if min_date and max_date:
+            date_range_days = span_days
+            latest_event_date = max_date
         
-        # 事件类型统计
-        cursor.execute('SELECT event_type, COUNT(*) as count FROM events GROUP BY event_type ORDER BY count DESC')
+        # 事件类型统计：数量和最新日期同一次GROUP BY取出
+        cursor.execute('SELECT event_type, COUNT(*) as count, MAX(date) FROM events GROUP BY event_type ORDER BY count DESC')
         type_stats_raw = cursor.fetchall()
-        
+
         event_type_stats = []
-        for event_type, count in type_stats_raw:
-            cursor.execute('SELECT MAX(date) FROM events WHERE event_type = ?', (event_type,))
-            latest_date = cursor.fetchone()[0]
-            
-            type_display = {
-                'custom': '自定义',
-                'policy': '政策',
-                'economic': '经济'
-            }.get(event_type, event_type)
-            
+        for event_type, count, latest_date in type_stats_raw:
+            type_display = _TYPE_DISPLAY.get(event_type, event_type)
+
             event_type_stats.append({
                 'type': event_type,
                 'type_display': type_display,
@@ -171,10 +207,7 @@ def get_data_statistics(events_db_file):
                 'latest_date': latest_date or '无'
             })
         
-        # 数据质量分析
-        cursor.execute('SELECT COUNT(DISTINCT date) FROM events')
-        unique_dates = cursor.fetchone()[0]
-        
+        # 数据质量分析（单日最大事件数需要GROUP BY，单独查询）
         cursor.execute('SELECT date, COUNT(*) as daily_count FROM events GROUP BY date ORDER BY daily_count DESC LIMIT 1')
         max_events_result = cursor.fetchone()
         max_events_per_day = max_events_result[1] if max_events_result else 0
@@ -203,77 +236,119 @@ def get_data_statistics(events_db_file):
         }
 
 
-def get_events_with_details(events_db_file):
-    """获取带有AI分析详情的事件数据（优先使用政策数据表）
-    
+# 每批预取的行数：百到千级是每行开销与内存占用的平衡点
+_FETCH_BATCH_SIZE = 1000
+
+
+def _policy_row_to_dict(event):
+    """policy_events联查行转字典（模块级函数便于批量map复用）"""
+    # 解析AI分析结果的JSON数据
+    industries = _json_loads(event[10]) if event[10] else []
+
+    return {
+        'id': event[0],
+        'date': event[1],
+        'title': event[2],
+        'event_type': event[3],
+        'department': event[4] if event[4] else '',
+        'policy_level': event[5] if event[5] else '',
+        'impact_level': event[6] if event[6] else '',
+        'source_url': event[7] if event[7] else '',
+        'created_at': event[8] if event[8] else '',
+        'content_type': event[9] if event[9] else '政策',
+        'ai_industries': industries,
+        'ai_summary': event[11] if event[11] else '',
+        'ai_confidence': event[12] if event[12] else None
+    }
+
+
+def _legacy_row_to_dict(row):
+    """旧events表行转字典"""
+    return {
+        'date': row[0],
+        'title': row[1],
+        'event_type': row[2],
+        'department': '',
+        'policy_level': '',
+        'impact_level': '',
+        'source_url': '',
+        'created_at': row[3],
+        'ai_industries': [],
+        'ai_sectors': [],
+        'ai_stocks': [],
+        'ai_summary': '',
+        'ai_confidence': None
+    }
+
+
+def iter_events_with_details(events_db_file, limit=None, offset=0):
+    """流式产出带有AI分析详情的事件数据（优先使用政策数据表）
+
+    按_FETCH_BATCH_SIZE分批fetchmany并yield，批量取数摊薄每行的
+    游标调用开销，峰值内存以一批而不是整个结果集为上界。
+
     Args:
         events_db_file (str): 事件数据库文件路径
-        
-    Returns:
-        list: 包含事件详情的列表
+        limit (int): 最多返回的行数，None表示不限制
+        offset (int): 跳过的行数（分页用）
+
+    Yields:
+        dict: 单条事件详情
     """
+    # SQLite中LIMIT -1表示不限制，OFFSET照常生效
+    limit_value = -1 if limit is None else limit
+
     with get_db_connection(events_db_file) as conn:
         cursor = conn.cursor()
-        
+
         # 首先尝试从新的政策数据表获取
         try:
             cursor.execute("""
-                SELECT pe.id, pe.date, pe.title, pe.event_type, pe.department, pe.policy_level, pe.impact_level, 
+                SELECT pe.id, pe.date, pe.title, pe.event_type, pe.department, pe.policy_level, pe.impact_level,
                        pe.source_url, pe.created_at, pe.content_type,
                        pa.industries, pa.analysis_summary, pa.confidence_score
                 FROM policy_events pe
                 LEFT JOIN policy_analysis pa ON pe.id = pa.policy_id
                 ORDER BY pe.date DESC
-            """)
-            events = cursor.fetchall()
-            
-            if events:
-                events_list = []
-                for event in events:
-                    # 解析AI分析结果的JSON数据
-                    industries = json.loads(event[10]) if event[10] else []
-                    
-                    events_list.append({
-                        'id': event[0],
-                        'date': event[1],
-                        'title': event[2],
-                        'event_type': event[3],
-                        'department': event[4] if event[4] else '',
-                        'policy_level': event[5] if event[5] else '',
-                        'impact_level': event[6] if event[6] else '',
-                        'source_url': event[7] if event[7] else '',
-                        'created_at': event[8] if event[8] else '',
-                        'content_type': event[9] if event[9] else '政策',
-                        'ai_industries': industries,
-                        'ai_summary': event[11] if event[11] else '',
-                        'ai_confidence': event[12] if event[12] else None
-                    })
-                
-                return events_list
+                LIMIT ? OFFSET ?
+            """, (limit_value, offset))
+
+            found_any = False
+            while True:
+                rows = cursor.fetchmany(_FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                found_any = True
+                yield from map(_policy_row_to_dict, rows)
+
+            if found_any:
+                return
         except sqlite3.OperationalError:
             # 如果政策数据表不存在，回退到旧表
             pass
-        
+
         # 回退到旧的events表
-        cursor.execute('SELECT date, title, event_type, created_at FROM events ORDER BY date DESC')
-        rows = cursor.fetchall()
-        
-        events = []
-        for row in rows:
-            events.append({
-                'date': row[0],
-                'title': row[1],
-                'event_type': row[2],
-                'department': '',
-                'policy_level': '',
-                'impact_level': '',
-                'source_url': '',
-                'created_at': row[3],
-                'ai_industries': [],
-                'ai_sectors': [],
-                'ai_stocks': [],
-                'ai_summary': '',
-                'ai_confidence': None
-            })
-        
-        return events
\ No newline at end of file
+        cursor.execute(
+            'SELECT date, title, event_type, created_at FROM events ORDER BY date DESC LIMIT ? OFFSET ?',
+            (limit_value, offset)
+        )
+
+        while True:
+            rows = cursor.fetchmany(_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            yield from map(_legacy_row_to_dict, rows)
+
+
+def get_events_with_details(events_db_file, limit=None, offset=0):
+    """获取带有AI分析详情的事件数据（整体物化为列表的兼容入口）
+
+    Args:
+        events_db_file (str): 事件数据库文件路径
+        limit (int): 最多返回的行数，None表示不限制
+        offset (int): 跳过的行数（分页用）
+
+    Returns:
+        list: 包含事件详情的列表
+    """
+    return list(iter_events_with_details(events_db_file, limit=limit, offset=offset))
\ No newline at end of file
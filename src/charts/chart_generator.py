@@ -3,11 +3,30 @@
 负责K线图的生成和相关数据处理功能
 """
 
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 from pyecharts.charts import Kline
 from pyecharts import options as opts
 from src.database.db_operations import get_db_connection, get_stock_kline_from_db
 
+# 渲染结果缓存：pyecharts出图的大头是把几千组OHLC序列化成JSON，
+# 同一只股票同一份数据（含事件）重复请求时直接复用HTML。
+# 键里带数据摘要，数据更新后自然失效。
+# 图表请求在Flask多线程下并发进来，OrderedDict的读改序和插入淘汰
+# 都不是原子操作，访问统一在锁内完成
+_render_cache = OrderedDict()
+_RENDER_CACHE_SIZE = 64
+_render_cache_lock = threading.Lock()
+
+# stock_kline补写的全局写锁：SQLite同一时刻只允许一个写者，
+# 多股票并发补全时靠它把INSERT段串行化
+_kline_write_lock = threading.Lock()
+
 
 def create_kline_chart(df_kline, stock_display_name, economic_events=None, custom_mock_events=None):
     """
@@ -25,107 +44,106 @@ def create_kline_chart(df_kline, stock_display_name, economic_events=None, custo
     if df_kline.empty:
         return "<p>无法加载K线数据，请稍后再试或检查后台日志。</p>"
 
-    dates = df_kline['date'].dt.strftime('%Y-%m-%d').tolist()
+    # OHLC只从DataFrame物化一次：ndarray同时用于缓存摘要、
+    # 标记点定位（numpy按位索引）和最终序列化
     # 数据格式: [open, close, low, high]
-    k_values = df_kline[['open', 'close', 'low', 'high']].values.tolist()
+    k_arr = df_kline[['open', 'close', 'low', 'high']].to_numpy()
 
-    kline = (
-        Kline()
-        .add_xaxis(xaxis_data=dates)
-        .add_yaxis(
-            series_name=f"{stock_display_name} 日K",
-            y_axis=k_values,
-            itemstyle_opts=opts.ItemStyleOpts(
-                color="#ec0000",  # 阳线颜色
-                color0="#00da3c", # 阴线颜色
-                border_color="#8A0000",
-                border_color0="#008F28",
-            ),
-            markline_opts=opts.MarkLineOpts(
-                data=[
-                    opts.MarkLineItem(type_="average", name="平均值")
-                ]
-            )
+    # 计算缓存键并查缓存；事件内容异常（不可哈希）时放弃缓存照常渲染
+    cache_key = None
+    try:
+        data_digest = hashlib.blake2b(
+            k_arr.tobytes(), digest_size=8
+        ).hexdigest()
+        events_key = (
+            tuple(sorted((e.get('date'), e.get('title')) for e in economic_events))
+            if economic_events else (),
+            tuple(sorted((str(e.get('id')), e.get('date'), e.get('title')) for e in custom_mock_events))
+            if custom_mock_events else (),
         )
-        .set_global_opts(
-            xaxis_opts=opts.AxisOpts(is_scale=True, axislabel_opts=opts.LabelOpts(rotate=30)),
-            yaxis_opts=opts.AxisOpts(
-                is_scale=True,
-                splitarea_opts=opts.SplitAreaOpts(
-                    is_show=True, areastyle_opts=opts.AreaStyleOpts(opacity=1)
-                ),
-            ),
-            tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="cross"),
-            datazoom_opts=[
-                opts.DataZoomOpts(type_="inside", xaxis_index=[0], range_start=80, range_end=100),
-                opts.DataZoomOpts(type_="slider", xaxis_index=[0], range_start=80, range_end=100, pos_bottom="0%"),
-            ],
-            title_opts=opts.TitleOpts(title=f"{stock_display_name} 日K线图", subtitle=f"数据截止: {dates[-1] if dates else 'N/A'}"),
-        )
-    )
+        cache_key = (stock_display_name, len(df_kline),
+                     str(df_kline['date'].iloc[-1]), data_digest, events_key)
+        with _render_cache_lock:
+            cached_html = _render_cache.get(cache_key)
+            if cached_html is not None:
+                _render_cache.move_to_end(cache_key)
+        if cached_html is not None:
+            return cached_html
+    except TypeError:
+        cache_key = None
 
-    # 处理经济事件标记
-    if economic_events and not df_kline.empty:
-        event_mark_points_data = []
+    # 格式化后的日期列表缓存在DataFrame.attrs上，
+    # 同一份数据重复出图时不必每行再分配一个字符串
+    dates = df_kline.attrs.get('dates_str')
+    if dates is None or len(dates) != len(df_kline):
+        dates = df_kline['date'].dt.strftime('%Y-%m-%d').tolist()
+        df_kline.attrs['dates_str'] = dates
+    # 日期到下标的映射建一次，事件定位用O(1)查表代替list.index线性扫描
+    date_index = {d: i for i, d in enumerate(dates)}
+    k_values = k_arr.tolist()
+
+    # 所有事件标记点在建图前一次性收集好，通过markpoint_opts直接挂到系列上，
+    # 让pyecharts只做一次options序列化，省掉渲染后再翻改options['series']的
+    # 三分支dict修补
+    all_mark_points = []
+
+    # 经济事件标记
+    if economic_events:
         for event in economic_events:
             event_date_str = event.get('date') # 格式应为 'YYYY-MM-DD'
             event_title = event.get('title', '经济事件')
-            if event_date_str in dates: # 确保事件日期在K线图的日期范围内
+            idx = date_index.get(event_date_str)
+            if idx is not None: # 确保事件日期在K线图的日期范围内
                 try:
-                    idx = dates.index(event_date_str)
-                    event_mark_points_data.append(
+                    all_mark_points.append(
                         opts.MarkPointItem(
-                            coord=[event_date_str, k_values[idx][3]], # [日期, 当日最高价]
+                            coord=[event_date_str, float(k_arr[idx, 3])], # [日期, 当日最高价]
                             name=event_title,
-                            value=event_title, 
-                            symbol='path://M8,0 L10.472,5.236 L16,6.18 L11.764,9.818 L13.056,15 L8,12.273 L2.944,15 L4.236,9.818 L0,6.18 L5.528,5.236 Z', 
+                            value=event_title,
+                            symbol='path://M8,0 L10.472,5.236 L16,6.18 L11.764,9.818 L13.056,15 L8,12.273 L2.944,15 L4.236,9.818 L0,6.18 L5.528,5.236 Z',
                             symbol_size=15,
-                            itemstyle_opts=opts.ItemStyleOpts(color='gold') 
+                            itemstyle_opts=opts.ItemStyleOpts(color='gold')
                         )
                     )
                 except (ValueError, IndexError) as e:
                     print(f"为事件 '{event_title}' 在日期 {event_date_str} 添加标记点时出错: {e}")
-                    pass 
-        
-        # 将事件标记点添加到图表
-        current_mark_point_opts = kline.options['series'][0].get('markPoint', opts.MarkPointOpts().opts)
-        if 'data' not in current_mark_point_opts or not current_mark_point_opts['data']:
-            current_mark_point_opts['data'] = [] # 初始化data列表
-        current_mark_point_opts['data'].extend(event_mark_points_data)
-        kline.options['series'][0]['markPoint'] = current_mark_point_opts
-
-    # 处理自定义模拟事件标记 (黄星星)
-    if custom_mock_events and not df_kline.empty:
-        custom_event_mark_points_data = []
+                    pass
+
+    # 自定义模拟事件标记 (黄星星)
+    if custom_mock_events:
         # Group events by date for stacking
-        events_by_date = {}
+        events_by_date = defaultdict(list)
         for event in custom_mock_events:
-            event_date_str = event.get('date') # 格式应为 'YYYY-MM-DD'
-            if event_date_str not in events_by_date:
-                events_by_date[event_date_str] = []
-            events_by_date[event_date_str].append(event)
+            # 日期格式应为 'YYYY-MM-DD'
+            events_by_date[event.get('date')].append(event)
+
+        # 价格区间整图只算一次，不在每个日期分组里重复max/min扫描
+        price_range = float(df_kline['high'].max() - df_kline['low'].min())
 
         for event_date_str, daily_events in events_by_date.items():
-            if event_date_str in dates:
+            idx = date_index.get(event_date_str)
+            if idx is not None:
                 try:
-                    idx = dates.index(event_date_str)
-                    candle_high = k_values[idx][3] # 当日最高价
-                    price_range = df_kline['high'].max() - df_kline['low'].min()
+                    candle_high = float(k_arr[idx, 3]) # 当日最高价
                     vertical_offset_increment = price_range * 0.01 # 1% of price range as offset
                     if vertical_offset_increment == 0: # Handle flat lines or single data point
                         vertical_offset_increment = candle_high * 0.01 if candle_high > 0 else 0.1
 
-                    for i, event in enumerate(daily_events):
+                    # 同一天叠放的星标y坐标一次numpy算完
+                    star_y_coords = (
+                        candle_high
+                        + np.arange(1, len(daily_events) + 1) * vertical_offset_increment
+                    ).tolist()
+
+                    for i, (event, star_y_coord) in enumerate(zip(daily_events, star_y_coords)):
                         event_title = event.get('title', '自定义事件')
-                        # Stack stars vertically by increasing y-coordinate
-                        star_y_coord = candle_high + (vertical_offset_increment * (i + 1))
                         # Create unique identifier for each event
                         if event.get('id'):
                             unique_event_id = str(event['id'])
                         else:
                             unique_event_id = f"{event_date_str}_{i}_{event_title}"
 
-                        custom_event_mark_points_data.append(
+                        all_mark_points.append(
                             opts.MarkPointItem(
                                 name=unique_event_id,  # Use unique ID as name for precise matching
                                 coord=[event_date_str, star_y_coord],
@@ -138,25 +156,51 @@ def create_kline_chart(df_kline, stock_display_name, economic_events=None, custo
                     print(f"为自定义事件 '{event_title}' 在日期 {event_date_str} 添加标记点时出错: {e}")
                     pass
 
-        # Add custom event mark points to the chart
-        mark_point_opt = kline.options['series'][0].get('markPoint')
+    kline = (
+        Kline()
+        .add_xaxis(xaxis_data=dates)
+        .add_yaxis(
+            series_name=f"{stock_display_name} 日K",
+            y_axis=k_values,
+            itemstyle_opts=opts.ItemStyleOpts(
+                color="#ec0000",  # 阳线颜色
+                color0="#00da3c", # 阴线颜色
+                border_color="#8A0000",
+                border_color0="#008F28",
+            ),
+            markline_opts=opts.MarkLineOpts(
+                data=[
+                    opts.MarkLineItem(type_="average", name="平均值")
+                ]
+            ),
+            markpoint_opts=opts.MarkPointOpts(data=all_mark_points) if all_mark_points else None,
+        )
+        .set_global_opts(
+            xaxis_opts=opts.AxisOpts(is_scale=True, axislabel_opts=opts.LabelOpts(rotate=30)),
+            yaxis_opts=opts.AxisOpts(
+                is_scale=True,
+                splitarea_opts=opts.SplitAreaOpts(
+                    is_show=True, areastyle_opts=opts.AreaStyleOpts(opacity=1)
+                ),
+            ),
+            tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="cross"),
+            datazoom_opts=[
+                opts.DataZoomOpts(type_="inside", xaxis_index=[0], range_start=80, range_end=100),
+                opts.DataZoomOpts(type_="slider", xaxis_index=[0], range_start=80, range_end=100, pos_bottom="0%"),
+            ],
+            title_opts=opts.TitleOpts(title=f"{stock_display_name} 日K线图", subtitle=f"数据截止: {dates[-1] if dates else 'N/A'}"),
+        )
+    )
 
-        if not mark_point_opt:
-            kline.options['series'][0]['markPoint'] = {'data': custom_event_mark_points_data}
-        elif isinstance(mark_point_opt, dict):
-            if 'data' not in mark_point_opt or not mark_point_opt['data']:
-                mark_point_opt['data'] = []
-            mark_point_opt['data'].extend(custom_event_mark_points_data)
-        elif hasattr(mark_point_opt, 'opts') and isinstance(mark_point_opt.opts, dict): 
-            if 'data' not in mark_point_opt.opts or not mark_point_opt.opts['data']:
-                mark_point_opt.opts['data'] = []
-            mark_point_opt.opts['data'].extend(custom_event_mark_points_data)
-            kline.options['series'][0]['markPoint'] = mark_point_opt.opts
-        else:
-            print(f"Unexpected markPoint structure: {type(mark_point_opt)}. Could not add custom event markers.")
-            kline.options['series'][0]['markPoint'] = {'data': custom_event_mark_points_data}
+    html = kline.render_embed()
 
-    return kline.render_embed()
+    if cache_key is not None:
+        with _render_cache_lock:
+            _render_cache[cache_key] = html
+            if len(_render_cache) > _RENDER_CACHE_SIZE:
+                _render_cache.popitem(last=False)
+
+    return html
 
 
 def fill_non_trading_days(df_kline):
@@ -171,64 +215,34 @@ def fill_non_trading_days(df_kline):
     """
     if df_kline.empty:
         return df_kline
-    
+
     # 确保数据按日期排序
-    df_kline = df_kline.sort_values(by='date').reset_index(drop=True)
-    
+    df_kline = df_kline.sort_values(by='date')
+
     # 获取日期范围
     start_date = df_kline['date'].min()
     end_date = df_kline['date'].max()
-    
-    # 创建完整的日期范围（包括周末和节假日）
+
+    # 创建完整的日期范围（包括周末和节假日），reindex一次性补出缺失行；
+    # 整个填充走pandas向量化内核，不再逐行iterrows拼dict
     date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    # 创建一个包含所有日期的DataFrame
-    full_df = pd.DataFrame({'date': date_range})
-    
-    # 合并原始数据
-    merged_df = pd.merge(full_df, df_kline, on='date', how='left')
-    
-    # 填充缺失的数据
-    filled_rows = []
-    last_close_price = None
-    
-    for i, row in merged_df.iterrows():
-        if pd.isna(row['open']):  # 如果是非交易日（缺失数据）
-            if last_close_price is not None:
-                # 使用上一个交易日的收盘价作为开高低收价格
-                filled_row = {
-                    'date': row['date'],
-                    'open': last_close_price,
-                    'close': last_close_price,
-                    'high': last_close_price,
-                    'low': last_close_price,
-                    'volume': 0  # 非交易日成交量为0
-                }
-                filled_rows.append(filled_row)
-        else:
-            # 交易日，保留原始数据并更新最后收盘价
-            filled_rows.append({
-                'date': row['date'],
-                'open': row['open'],
-                'close': row['close'],
-                'high': row['high'],
-                'low': row['low'],
-                'volume': row['volume']
-            })
-            last_close_price = row['close']
-    
-    # 创建新的DataFrame
-    result_df = pd.DataFrame(filled_rows)
-    
-    # 确保数据类型正确
-    result_df['date'] = pd.to_datetime(result_df['date'])
-    result_df['open'] = pd.to_numeric(result_df['open'])
-    result_df['close'] = pd.to_numeric(result_df['close'])
-    result_df['high'] = pd.to_numeric(result_df['high'])
-    result_df['low'] = pd.to_numeric(result_df['low'])
-    result_df['volume'] = pd.to_numeric(result_df['volume'])
-    
-    return result_df
+    filled_df = df_kline.set_index('date').reindex(date_range)
+
+    # 非交易日：开高低收都用上一个交易日的收盘价，成交量记0
+    filled_close = filled_df['close'].ffill()
+    filled_df['close'] = filled_close
+    filled_df['open'] = filled_df['open'].fillna(filled_close)
+    filled_df['high'] = filled_df['high'].fillna(filled_close)
+    filled_df['low'] = filled_df['low'].fillna(filled_close)
+    # reindex引入NaN会把volume升格成float64，补0后一次astype还原入参dtype；
+    # 价格列本来就是float，dtype天然正确，无需再跑逐列to_numeric
+    filled_df['volume'] = filled_df['volume'].fillna(0).astype(
+        df_kline['volume'].dtype, copy=False)
+
+    # 首个交易日之前没有可借用的收盘价，与原实现一致直接丢弃
+    filled_df = filled_df[filled_df['close'].notna()]
+
+    return filled_df.rename_axis('date').reset_index()
 
 
 def check_and_fill_missing_non_trading_days(stock_code, events_db_file):
@@ -252,17 +266,12 @@ def check_and_fill_missing_non_trading_days(stock_code, events_db_file):
     start_date = existing_data['date'].min()
     end_date = existing_data['date'].max()
     
-    # 创建完整的日期范围
+    # 创建完整的日期范围，缺失日期用DatetimeIndex的C级集合差集算出，
+    # 不再逐日构造Python date对象比对
     date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    existing_dates = set(existing_data['date'].dt.date)
-    
-    # 找出缺失的日期
-    missing_dates = []
-    for date in date_range:
-        if date.date() not in existing_dates:
-            missing_dates.append(date)
-    
-    if not missing_dates:
+    missing_dates = date_range.difference(pd.DatetimeIndex(existing_data['date']).normalize())
+
+    if missing_dates.empty:
         print(f"{stock_code} 无缺失的非交易日，无需补全")
         return
     
@@ -270,30 +279,55 @@ def check_and_fill_missing_non_trading_days(stock_code, events_db_file):
     
     # 填充缺失的非交易日
     filled_data = fill_non_trading_days(existing_data)
-    
-    # 保存补全后的数据到数据库
-    with get_db_connection(events_db_file) as conn:
-        cursor = conn.cursor()
-        
-        # 只保存新增的非交易日数据
-        for date in missing_dates:
-            # 找到该日期对应的数据
-            date_data = filled_data[filled_data['date'].dt.date == date.date()]
-            if not date_data.empty:
-                row = date_data.iloc[0]
-                cursor.execute('''
-                    INSERT OR REPLACE INTO stock_kline 
-                    (stock_code, date, open, close, high, low, volume, updated_at) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (
-                    stock_code,
-                    row['date'].strftime('%Y-%m-%d'),
-                    float(row['open']),
-                    float(row['close']),
-                    float(row['high']),
-                    float(row['low']),
-                    int(row['volume'])
-                ))
-        
-        conn.commit()
-    print(f"已为 {stock_code} 补全 {len(missing_dates)} 个非交易日的占位蜡烛")
\ No newline at end of file
+
+    # 只保存新增的非交易日数据：一次布尔掩码切出所有缺失行，
+    # 然后executemany在单个事务里批量写入，不再逐日期过滤、逐行INSERT
+    missing_set = {d.date() for d in missing_dates}
+    new_rows = filled_data[filled_data['date'].dt.date.isin(missing_set)]
+    rows = list(zip(
+        [stock_code] * len(new_rows),
+        new_rows['date'].dt.strftime('%Y-%m-%d'),
+        new_rows['open'].astype(float),
+        new_rows['close'].astype(float),
+        new_rows['high'].astype(float),
+        new_rows['low'].astype(float),
+        new_rows['volume'].astype(int)
+    ))
+
+    # WAL下多线程读互不阻塞，但写只能有一个：插入段串行化，避免SQLITE_BUSY
+    with _kline_write_lock:
+        with get_db_connection(events_db_file) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO stock_kline
+                (stock_code, date, open, close, high, low, volume, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', rows)
+            conn.commit()
+    print(f"已为 {stock_code} 补全 {len(rows)} 个非交易日的占位蜡烛")
+
+
+def check_and_fill_all_stocks(stock_codes, events_db_file, max_workers=4):
+    """并发补全多只股票缺失的非交易日占位蜡烛
+
+    每只股票的读取和pandas填充互相独立，用线程池并行跑；
+    每个工作线程各开各的连接（WAL允许多读一写），
+    最终写库由check_and_fill_missing_non_trading_days内部的锁串行化。
+
+    Args:
+        stock_codes: 股票代码列表
+        events_db_file: 事件数据库文件路径
+        max_workers: 并发线程数
+    """
+    if not stock_codes:
+        return
+
+    def _fill_one(stock_code):
+        try:
+            check_and_fill_missing_non_trading_days(stock_code, events_db_file)
+        except Exception as e:
+            print(f"补全 {stock_code} 非交易日失败: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list()驱动迭代器，确保所有任务完成后再返回
+        list(executor.map(_fill_one, stock_codes))
\ No newline at end of file
@@ -1,22 +1,45 @@
 # 建议整理导入
 from typing import Dict, List, Optional
 import asyncio
+import atexit
+import hashlib
 import json
 import logging
+import os
 import random
 import re
 import sqlite3
+import threading
 import time
+import zlib
+from bisect import bisect_right
+from collections import deque
 from contextlib import contextmanager
 from datetime import datetime
 from functools import wraps
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import aiohttp
 import openai
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 
+# 可选启用uvloop事件循环（降低异步批量分析时的事件循环开销），未安装时静默回退
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
+# 可选依赖：orjson是C实现，解析多KB中文AI回复比标准库快数倍，
+# 未安装时回退标准库json（与data_statistics模块同一套处理）
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 # 配置常量
 class Config:
     # API配置
@@ -34,11 +57,17 @@ class Config:
     
     # 内容抓取配置
     REQUEST_TIMEOUT = 10
+    FETCH_MAX_RETRIES = 3
+    FETCH_CHUNK_SIZE = 8192
+    FETCH_MAX_BYTES = 32768  # 流式读取的字节上限，超出部分直接丢弃
+    FETCH_SYNC_MAX_BYTES = 262144  # 同步抓取解压后读取的字节上限
+    FETCH_ABORT_BYTES = 8388608  # Content-Length超过8MB的页面直接放弃
     MIN_CONTENT_LENGTH = 200
     FULL_CONTENT_THRESHOLD = 500
     PARTIAL_CONTENT_THRESHOLD = 100
     MAX_CONTENT_LENGTH = 3000
-    BATCH_DELAY = 0.8  # 批量处理间隔延迟（秒）
+    WRITE_FLUSH_THRESHOLD = 64  # 分析结果写入合并阈值（条）
+    PROMPT_CACHE_TTL = 604800  # AI响应缓存有效期（秒，7天）
     
     # 请求头配置
     DEFAULT_HEADERS = {
@@ -67,6 +96,244 @@ class Config:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HTML解析器：lxml是C实现，比纯Python的html.parser快一个数量级；
+# 环境里没有lxml时回退标准解析器
+try:
+    import lxml  # noqa: F401
+    _BS_PARSER = 'lxml'
+except ImportError:
+    _BS_PARSER = 'html.parser'
+
+# 可选依赖：selectolax封装的Lexbor引擎解析HTML比lxml再快约一个
+# 数量级且解析期间释放GIL，装了就优先走它，否则用BeautifulSoup路径
+try:
+    from selectolax.lexbor import LexborHTMLParser as _LexborParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _LexborParser
+    except ImportError:
+        _LexborParser = None
+
+# 15个内容选择器合成一个联合选择器，一次树遍历拿到全部候选节点，
+# 不再每个选择器都重新走一遍DOM
+_COMBINED_CONTENT_SELECTOR = ", ".join(Config.CONTENT_SELECTORS)
+
+# 过滤关键词并成一个正则，每行一次C层扫描代替对9个子串的Python循环
+_FILTER_KEYWORDS_RE = re.compile("|".join(re.escape(k) for k in Config.FILTER_KEYWORDS))
+
+# 复用的JSON解码器，raw_decode可从任意偏移提取嵌在说明文字里的JSON对象
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _backoff_delay(attempt: int) -> float:
+    """指数退避延迟加随机抖动，上限30秒（抖动避免重试方齐步踩踏）"""
+    return min(2 ** attempt + random.uniform(0, 1), 30.0)
+
+
+def _extract_json_object(text: str):
+    """从AI回复中提取首个JSON对象（同步与异步解析路径共用）
+
+    raw_decode从首个'{'开始在C层一趟解出完整对象（任意嵌套深度都
+    正确配平），没有'{'时按纯JSON整体解析。解析失败抛ValueError。
+    """
+    start_idx = text.find('{')
+    if start_idx == -1:
+        return _json_loads(text)
+    result, _ = _JSON_DECODER.raw_decode(text, start_idx)
+    return result
+
+# 行业列表落库用的编码器：ensure_ascii=False保留中文原文，
+# 紧凑分隔符让存储的JSON更小；orjson默认输出即紧凑UTF-8，语义一致
+try:
+    from orjson import dumps as _orjson_dumps
+
+    def _encode_industries(obj) -> str:
+        return _orjson_dumps(obj).decode()
+except ImportError:
+    _encode_industries = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def _compress_content(text: str) -> Optional[bytes]:
+    """政策原文压缩为zlib BLOB落库，空文本存NULL
+
+    中文UTF-8正文压缩比通常在3-5倍，批量重分析的全表扫描
+    读的页数随之成倍减少。SQLite列是动态类型，BLOB可以直接
+    存进声明为TEXT的full_content列，存量查询条件不受影响。
+    """
+    return zlib.compress(text.encode('utf-8'), 6) if text else None
+
+
+def _decompress_content(value) -> Optional[str]:
+    """读取full_content列：BLOB按zlib解压，历史TEXT行原样返回"""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value or None
+
+# 超过该长度的页面才值得付出进程间传输成本去跨核解析
+_PARSE_PROCESS_THRESHOLD = 200_000
+
+# industries里表示失败/无结果的标记值，不属于真实行业，不进倒排索引表
+_NON_INDUSTRY_MARKERS = frozenset({'分析失败', '分析后无相关行业'})
+
+
+def _industry_index_rows(policy_id: int, industries) -> list:
+    """展开单条分析结果的(policy_id, industry)倒排行，过滤标记值"""
+    return [(policy_id, str(ind)) for ind in industries
+            if str(ind) not in _NON_INDUSTRY_MARKERS]
+
+# 内容质量按长度分级：bisect查表代替链式比较，阈值与标签一一对应
+_QUALITY_BOUNDS = (Config.PARTIAL_CONTENT_THRESHOLD, Config.FULL_CONTENT_THRESHOLD)
+_QUALITY_LABELS = ('title_only', 'partial', 'full')
+
+
+def _has_full(text) -> bool:
+    """判断文本是否足以作为"完整内容"参与分析"""
+    return bool(text and len(text) > 50)
+
+# 解析进程池按需创建：多数批次页面都不大，用不到就不起子进程
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool():
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+                atexit.register(_parse_pool.shutdown)
+    return _parse_pool
+
+
+def _extract_policy_content_lexbor(html: str) -> str:
+    """selectolax/Lexbor版本的正文提取，与BeautifulSoup路径语义一致"""
+    tree = _LexborParser(html)
+    tree.strip_tags(['script', 'style'])
+
+    for node in tree.css(_COMBINED_CONTENT_SELECTOR):
+        content_text = node.text(separator='\n', strip=True)
+        if len(content_text) > Config.MIN_CONTENT_LENGTH:
+            logger.info(f"成功抓取内容，长度: {len(content_text)}字符")
+            return content_text
+
+    body = tree.body
+    content_text = ""
+    if body is not None:
+        content_text = '\n'.join(
+            line for line in body.text(separator='\n', strip=True).split('\n')
+            if len(line) > 10 and not _FILTER_KEYWORDS_RE.search(line)
+        )
+
+    if len(content_text) > Config.MIN_CONTENT_LENGTH:
+        logger.info(f"从body提取内容，长度: {len(content_text)}字符")
+        return content_text
+
+    logger.warning(f"抓取的内容过短: {len(content_text)}字符")
+    return ""
+
+
+def _extract_policy_content(html: str) -> str:
+    """从页面HTML中提取政策正文（模块级纯函数，可被进程池pickle调用）"""
+    if _LexborParser is not None:
+        try:
+            return _extract_policy_content_lexbor(html)
+        except Exception as e:
+            # Lexbor解析异常时回退BeautifulSoup路径
+            logger.warning(f"Lexbor解析失败，回退BeautifulSoup: {str(e)}")
+
+    soup = BeautifulSoup(html, _BS_PARSER)
+
+    # 移除脚本和样式标签
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # 联合选择器一趟取出所有候选容器，取第一个内容足够长的
+    content_text = ""
+    try:
+        for content_elem in soup.select(_COMBINED_CONTENT_SELECTOR):
+            content_text = content_elem.get_text(separator='\n', strip=True)
+            if len(content_text) > Config.MIN_CONTENT_LENGTH:  # 确保抓取到足够的内容
+                logger.info(f"成功抓取内容，长度: {len(content_text)}字符")
+                return content_text
+    except Exception:
+        pass
+
+    # 如果没有找到特定容器，尝试从body提取：直接遍历文本节点过滤，
+    # 不先用get_text物化整页文本再split一遍，长页面少一次全量拷贝。
+    # 过滤掉导航、菜单等无关内容
+    body = soup.find('body')
+    if body:
+        content_text = '\n'.join(
+            line for line in body.stripped_strings
+            if len(line) > 10 and not _FILTER_KEYWORDS_RE.search(line)
+        )
+
+    if len(content_text) > Config.MIN_CONTENT_LENGTH:
+        logger.info(f"从body提取内容，长度: {len(content_text)}字符")
+        return content_text
+
+    logger.warning(f"抓取的内容过短: {len(content_text)}字符")
+    return ""
+
+# 分析要求模板（两个变体只差几处措辞，在导入时各格式化一次，避免每次分析重复构建）
+_BASE_ANALYSIS_REQUEST = """
+请从以下几个方面进行分析：
+1. 相关行业：列出可能受到影响的主要行业（最多5个）
+2. 影响程度：评估对股市的整体影响程度（正面/负面/中性）
+3. 分析摘要：{summary_instruction}
+4. 置信度：对分析结果的置信度评分（0-1之间{confidence_note}）
+
+请以JSON格式返回结果：
+{{
+    "industries": ["行业1", "行业2", ...],
+    "impact_type": "正面/负面/中性",
+    "analysis_summary": "分析摘要",
+    "confidence_score": {default_confidence}
+}}
+"""
+
+_ANALYSIS_REQUEST_FULL = _BASE_ANALYSIS_REQUEST.format(
+    summary_instruction="基于完整政策内容，详细说明政策的主要影响点和逻辑",
+    confidence_note="",
+    default_confidence="0.8"
+)
+
+_ANALYSIS_REQUEST_BRIEF = _BASE_ANALYSIS_REQUEST.format(
+    summary_instruction="简要说明政策的主要影响点和逻辑",
+    confidence_note="，由于缺乏详细内容应适当降低",
+    default_confidence="0.5"
+)
+
+# 系统提示前缀，同步与异步API调用共用
+_SYSTEM_PROMPT = "你是一个专业的金融政策分析师，擅长分析政策新闻对股票市场的影响。请根据政策内容分析相关的行业、板块和个股。\n\n"
+
+# 完整的prompt骨架（含系统提示前缀）也在导入时拼好，每次调用只剩
+# 一次%插值，不再嵌套format整个多行模板、也不再逐次拼接前缀
+_PROMPT_WITH_CONTENT = _SYSTEM_PROMPT + """
+请分析以下政策对中国股市的影响：
+
+标题：%s
+事件类型：%s
+
+完整内容：
+%s%s
+
+""" + _ANALYSIS_REQUEST_FULL + "\n"
+
+_PROMPT_TITLE_ONLY = _SYSTEM_PROMPT + """
+请分析以下政策对中国股市的影响：
+
+标题：%s
+内容：%s
+事件类型：%s
+原文链接：%s
+
+注意：由于缺乏详细政策内容，请基于标题进行初步分析，并在置信度评分中体现这一限制。
+
+""" + _ANALYSIS_REQUEST_BRIEF + "\n"
+
 def retry_with_backoff(max_retries=Config.DEFAULT_MAX_RETRIES, 
                       base_delay=Config.DEFAULT_BASE_DELAY, 
                       max_delay=Config.DEFAULT_MAX_DELAY):
@@ -108,44 +375,116 @@ class RateLimiter:
     def __init__(self, max_calls=Config.DEFAULT_MAX_CALLS, time_window=Config.DEFAULT_TIME_WINDOW):
         self.max_calls = max_calls
         self.time_window = time_window
-        self.calls = []
-        self._lock = asyncio.Lock() if hasattr(asyncio, 'current_task') else None
-    
+        # deque两端操作均摊O(1)，过期记录popleft弹出即可，
+        # 不再每次调用都重建整个时间戳列表
+        self.calls = deque()
+        self._lock = asyncio.Lock()
+
     async def wait_if_needed(self):
         """检查是否需要等待以满足速率限制"""
-        if self._lock:
-            async with self._lock:
-                await self._check_and_wait()
-        else:
-            self._check_and_wait_sync()
-    
-    def _check_and_wait_sync(self):
-        """同步版本的速率检查"""
+        async with self._lock:
+            await self._check_and_wait()
+
+    def _evict_and_get_wait(self):
+        """弹出窗口外的旧记录，返回需要等待的秒数（0表示无需等待）"""
         now = time.time()
-        # 移除时间窗口外的调用记录
-        self.calls = [call_time for call_time in self.calls if call_time > now - self.time_window]
-        
+        cutoff = now - self.time_window
+        while self.calls and self.calls[0] <= cutoff:
+            self.calls.popleft()
+
         if len(self.calls) >= self.max_calls:
-            sleep_time = self.time_window - (now - self.calls[0])
-            if sleep_time > 0:
-                logger.info(f"达到速率限制，等待 {sleep_time:.2f} 秒")
-                time.sleep(sleep_time)
-        
-        self.calls.append(now)
-    
+            return self.time_window - (now - self.calls[0])
+        return 0
+
+    def _check_and_wait_sync(self):
+        """同步版本的速率检查"""
+        sleep_time = self._evict_and_get_wait()
+        if sleep_time > 0:
+            logger.info(f"达到速率限制，等待 {sleep_time:.2f} 秒")
+            time.sleep(sleep_time)
+
+        self.calls.append(time.time())
+
     async def _check_and_wait(self):
         """异步版本的速率检查"""
+        sleep_time = self._evict_and_get_wait()
+        if sleep_time > 0:
+            logger.info(f"达到速率限制，等待 {sleep_time:.2f} 秒")
+            await asyncio.sleep(sleep_time)
+
+        self.calls.append(time.time())
+
+    def update_from_headers(self, headers) -> None:
+        """用响应头里的配额信息校准本地窗口
+
+        静态上限要么用不满配额、要么超发撞429。服务端通过
+        X-RateLimit-Remaining报告的剩余额度比本地窗口估计的少时，
+        向窗口补记占位时间戳，让后续调用按真实剩余额度排队。
+        """
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+        except (TypeError, ValueError):
+            return
+
         now = time.time()
-        # 移除时间窗口外的调用记录
-        self.calls = [call_time for call_time in self.calls if call_time > now - self.time_window]
-        
-        if len(self.calls) >= self.max_calls:
-            sleep_time = self.time_window - (now - self.calls[0])
-            if sleep_time > 0:
-                logger.info(f"达到速率限制，等待 {sleep_time:.2f} 秒")
-                await asyncio.sleep(sleep_time)
-        
-        self.calls.append(now)
+        cutoff = now - self.time_window
+        while self.calls and self.calls[0] <= cutoff:
+            self.calls.popleft()
+
+        deficit = (self.max_calls - len(self.calls)) - remaining
+        if deficit > 0:
+            self.calls.extend([now] * deficit)
+            logger.debug(f"按服务端配额校准速率窗口，补记{deficit}个占位")
+
+
+class AdaptiveConcurrencyLimiter:
+    """可动态调整上限的并发限制器
+
+    asyncio.Semaphore的上限在创建后无法安全缩小；这里用显式计数
+    配合Condition实现同样的准入控制：遇到429/5xx时把上限减半形成
+    背压，在途任务自然收敛到新上限；连续成功后逐格恢复到初始值。
+    """
+
+    def __init__(self, max_concurrent: int):
+        self._initial_cap = max(1, max_concurrent)
+        self._cap = self._initial_cap
+        self._active = 0
+        self._success_streak = 0
+        self._cv = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cv:
+            while self._active >= self._cap:
+                await self._cv.wait()
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cv:
+            self._active -= 1
+            self._cv.notify(1)
+
+    async def throttle(self):
+        """遇到限流/服务器错误时把并发上限减半"""
+        async with self._cv:
+            self._success_streak = 0
+            if self._cap > 1:
+                self._cap = max(1, self._cap // 2)
+                logger.warning(f"检测到限流/服务器错误，并发上限下调至{self._cap}")
+
+    async def note_success(self):
+        """记录一次成功调用，持续顺利时把上限加回一格"""
+        async with self._cv:
+            self._success_streak += 1
+            if self._cap < self._initial_cap and self._success_streak >= 2 * self._cap:
+                self._cap += 1
+                self._success_streak = 0
+                self._cv.notify(1)
+                logger.info(f"API调用持续成功，并发上限恢复至{self._cap}")
+
 
 class AIPolicyAnalyzer:
     """AI政策分析器，使用硅基流动API分析政策新闻的相关行业、板块、个股"""
@@ -156,14 +495,91 @@ class AIPolicyAnalyzer:
         self.model = model or Config.DEFAULT_MODEL
         self.db_path = db_path
         self.rate_limiter = RateLimiter()
-        
+        # 本次运行中抓取失败的URL缓存，避免对已知失效的链接重复发起请求
+        self._url_fail_cache = set()
+        # 批量预抓取的原文内容缓存（URL -> 正文），逐条分析时优先取缓存；
+        # 多条政策共用同一source_url时第二次起直接命中
+        self._content_cache = {}
+        # 已存储原文的内存缓存（policy_id -> 正文），写入新分析结果时失效
+        self._stored_content_cache = {}
+        # 同步抓取复用Session：keep-alive跳过同主机重复请求的TCP+TLS握手，
+        # 加大连接池以覆盖多个政府站点域名；瞬时网关错误的重试下沉到
+        # urllib3传输层（带退避），Python侧不再包裹重试循环
+        self._session = requests.Session()
+        self._session.headers.update(Config.DEFAULT_HEADERS)
+        _adapter = HTTPAdapter(
+            pool_connections=32, pool_maxsize=32,
+            max_retries=Retry(
+                total=Config.FETCH_MAX_RETRIES,
+                backoff_factor=1,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset(['GET', 'HEAD'])
+            )
+        )
+        self._session.mount('http://', _adapter)
+        self._session.mount('https://', _adapter)
+        # 待批量落库的分析结果，由queue_analysis_result/flush_analysis_results维护
+        self._pending_writes = []
+        # 异步批量分析时的数据库写入线程：SQLite同一时刻只有一个写者，
+        # 单线程写入避免SQLITE_BUSY竞争，同时把阻塞的DB操作挪出事件循环
+        self._db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+
+        # 每线程复用的数据库长连接：省掉每次DB操作重复的文件打开、
+        # WAL/SHM映射和PRAGMA解析，进程退出时统一关闭
+        self._conn_local = threading.local()
+        self._open_conns = []
+        self._open_conns_lock = threading.Lock()
+        atexit.register(self._close_db_connections)
+
+        # 异步API调用的不变部分在构造时准备好，每次调用只需要插入prompt
+        self._api_url = f"{self.api_base_url}/v1/completions"
+        self._api_headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        self._api_body_base = {
+            "model": self.model,
+            "temperature": 0.3,
+            "max_tokens": 2000
+        }
+        self._api_timeout = aiohttp.ClientTimeout(
+            total=120,  # 总超时时间
+            connect=10,  # 连接超时
+            sock_read=90  # 读取超时
+        )
+        # 健康检查结果缓存：(检查时间戳, 是否可用)
+        self._health_cache = (0.0, False)
+
+        # 连续批量分析的键集分页游标：上一批扫到的最早政策日期，
+        # 下一批从它之前继续，避免重复扫描表头；扫空后回绕重置
+        self._unanalyzed_cursor: Optional[str] = None
+
+        # 当前异步批次的自适应并发限制器，由批次入口创建和清理；
+        # call_ai_api_async据此把429/5xx反馈为并发上限调整
+        self._concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None
+
+        # 异步路径共享的aiohttp会话（懒创建）：AI调用和原文抓取复用同一个
+        # 连接池，省掉每次请求的DNS查询和TLS握手。会话绑定创建它的事件循环，
+        # 记录循环引用以便换循环后重建
+        self._aio_session: Optional[aiohttp.ClientSession] = None
+        self._aio_session_loop = None
+        # 原文抓取的单请求超时（API调用用会话级的_api_timeout）
+        self._fetch_timeout = aiohttp.ClientTimeout(total=60, connect=Config.REQUEST_TIMEOUT)
+
         # 设置openai配置（适用于0.8.0版本）
         openai.api_key = self.api_key
         openai.api_base = self.api_base_url
         
         self.init_analysis_table()
     
-    def _create_failed_response(self, reason: str, content_quality: str = "title_only", 
+    def _classify_content_quality(self, content: str) -> str:
+        """根据内容长度判断内容质量等级"""
+        if not content:
+            return "title_only"
+        # bisect_right定位长度落在哪个区间，直接按下标取标签
+        return _QUALITY_LABELS[bisect_right(_QUALITY_BOUNDS, len(content) - 1)]
+
+    def _create_failed_response(self, reason: str, content_quality: str = "title_only",
                                full_content: str = "") -> Dict:
         """创建标准的分析失败响应"""
         return {
@@ -178,36 +594,10 @@ class AIPolicyAnalyzer:
     def _parse_api_response(self, ai_response: str) -> Optional[Dict]:
         """解析AI API响应的JSON内容"""
         try:
-            # 尝试解析JSON
-            # 有时AI会在JSON前后添加说明文字，需要提取JSON部分
-            start_idx = ai_response.find('{')
-            
-            if start_idx == -1:
-                logger.error("AI返回结果中未找到JSON开始标记")
-                return None
-            
-            # 使用括号计数来找到完整的JSON对象
-            brace_count = 0
-            end_idx = start_idx
-            
-            for i in range(start_idx, len(ai_response)):
-                if ai_response[i] == '{':
-                    brace_count += 1
-                elif ai_response[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        end_idx = i + 1
-                        break
-            
-            if brace_count != 0:
-                logger.error("AI返回结果中JSON格式不完整，括号不匹配")
-                return None
-            
-            json_str = ai_response[start_idx:end_idx]
-            logger.debug(f"提取的JSON字符串: {json_str[:200]}...")
-            
-            result = json.loads(json_str)
-            
+            # 有时AI会在JSON前后添加说明文字，共用的提取函数
+            # 负责从首个'{'一趟解出完整对象
+            result = _extract_json_object(ai_response)
+
             # 验证必要字段
             required_fields = ['industries', 'analysis_summary', 'confidence_score']
             for field in required_fields:
@@ -238,99 +628,99 @@ class AIPolicyAnalyzer:
             logger.error(f"解析AI返回结果时发生异常: {str(e)}")
             return None
     
-    def _build_analysis_prompt(self, title: str, content: str, event_type: str, 
+    def _build_analysis_prompt(self, title: str, content: str, event_type: str,
                               source_url: str = "", has_full_content: bool = False) -> str:
         """构建分析prompt模板"""
-        base_analysis_request = """
-请从以下几个方面进行分析：
-1. 相关行业：列出可能受到影响的主要行业（最多5个）
-2. 影响程度：评估对股市的整体影响程度（正面/负面/中性）
-3. 分析摘要：{summary_instruction}
-4. 置信度：对分析结果的置信度评分（0-1之间{confidence_note}）
-
-请以JSON格式返回结果：
-{{
-    "industries": ["行业1", "行业2", ...],
-    "impact_type": "正面/负面/中性",
-    "analysis_summary": "分析摘要",
-    "confidence_score": {default_confidence}
-}}
-"""
-        
         if has_full_content:
             truncated_content = content[:Config.MAX_CONTENT_LENGTH]
             truncation_note = '...(内容过长已截断)' if len(content) > Config.MAX_CONTENT_LENGTH else ''
-            
-            return f"""
-请分析以下政策对中国股市的影响：
 
-标题：{title}
-事件类型：{event_type if event_type else '未知'}
-
-完整内容：
-{truncated_content}{truncation_note}
+            return _PROMPT_WITH_CONTENT % (
+                title,
+                event_type if event_type else '未知',
+                truncated_content,
+                truncation_note
+            )
 
-{base_analysis_request.format(
-    summary_instruction="基于完整政策内容，详细说明政策的主要影响点和逻辑",
-    confidence_note="",
-    default_confidence="0.8"
-)}
-"""
-        else:
-            return f"""
-请分析以下政策对中国股市的影响：
+        return _PROMPT_TITLE_ONLY % (
+            title,
+            content if content else '无详细内容',
+            event_type if event_type else '未知',
+            source_url if source_url else '无'
+        )
+    
+    # 健康检查结果的有效期（秒）
+    _HEALTH_CHECK_TTL = 60
 
-标题：{title}
-内容：{content if content else '无详细内容'}
-事件类型：{event_type if event_type else '未知'}
-原文链接：{source_url if source_url else '无'}
+    def check_api_health(self):
+        """检查API健康状态
 
-注意：由于缺乏详细政策内容，请基于标题进行初步分析，并在置信度评分中体现这一限制。
+        访问/v1/models元数据接口代替发起一次真实的补全调用，
+        不消耗推理配额也不占用速率限制；结果缓存60秒，
+        频繁调用时只有缓存过期后才真正发请求。
+        """
+        now = time.time()
+        checked_at, healthy = self._health_cache
+        if now - checked_at < self._HEALTH_CHECK_TTL:
+            return healthy
 
-{base_analysis_request.format(
-    summary_instruction="简要说明政策的主要影响点和逻辑",
-    confidence_note="，由于缺乏详细内容应适当降低",
-    default_confidence="0.5"
-)}
-"""
-    
-    async def check_api_health(self):
-        """检查API健康状态"""
         try:
-            # 使用旧版本openai API进行健康检查
-            response = openai.Completion.create(
-                model=self.model,
-                prompt="test",
-                max_tokens=10,
-                temperature=0.1
+            response = self._session.get(
+                f"{self.api_base_url}/v1/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=5
             )
-            
-            if response and response.get('choices'):
+            healthy = response.status_code == 200
+            if healthy:
                 logger.info("API健康检查通过")
-                return True
             else:
-                logger.warning("API健康检查失败：响应格式异常")
-                return False
-                
+                logger.warning(f"API健康检查失败：HTTP {response.status_code}")
         except Exception as e:
+            healthy = False
             logger.error(f"API健康检查异常: {e}")
-            return False
+
+        self._health_cache = (now, healthy)
+        return healthy
     
+    def _init_thread_connection(self):
+        """为当前线程建立数据库长连接并做一次性PRAGMA配置
+
+        放大语句缓存：本类的UPSERT/查询SQL都是常量字符串，
+        配合长连接可以一直命中已编译的语句，每次执行只重新绑定参数。
+        """
+        conn = sqlite3.connect(self.db_path, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        # WAL下读写互不阻塞；NORMAL在WAL模式下足够安全且大幅减少fsync；
+        # busy_timeout避免与其他写者短暂冲突时直接报SQLITE_BUSY
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        with self._open_conns_lock:
+            self._open_conns.append(conn)
+        return conn
+
+    def _close_db_connections(self):
+        """关闭本实例打开过的所有线程长连接（进程退出时调用）"""
+        with self._open_conns_lock:
+            for conn in self._open_conns:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._open_conns.clear()
+
     @contextmanager
     def get_db_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
+        """获取数据库连接的上下文管理器（线程内复用，退出时不关闭）"""
+        conn = getattr(self._conn_local, 'conn', None)
+        if conn is None:
+            conn = self._conn_local.conn = self._init_thread_connection()
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
             yield conn
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            raise e
-        finally:
-            if conn:
-                conn.close()
+        except Exception:
+            conn.rollback()
+            raise
     
     def init_analysis_table(self):
         """初始化分析结果表"""
@@ -346,7 +736,8 @@ class AIPolicyAnalyzer:
                     analysis_summary TEXT,  -- 分析摘要
                     confidence_score REAL,  -- 置信度分数
                     content_quality TEXT DEFAULT 'title_only',  -- 分析时使用的内容质量: full/partial/title_only
-                    full_content TEXT,  -- 存储政策原文完整内容
+                    full_content TEXT,  -- 政策原文完整内容（zlib压缩BLOB，旧行可能是明文TEXT）
+                    analysis_status TEXT DEFAULT 'success',  -- 分析状态: success/empty/failed
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (policy_id) REFERENCES policy_events (id)
                 )
@@ -362,8 +753,106 @@ class AIPolicyAnalyzer:
                 
             if 'full_content' not in columns:
                 cursor.execute('ALTER TABLE policy_analysis ADD COLUMN full_content TEXT')
-                logger.info("已添加full_content字段到policy_analysis表")        
-            
+                logger.info("已添加full_content字段到policy_analysis表")
+
+            if 'analysis_status' not in columns:
+                cursor.execute('ALTER TABLE policy_analysis ADD COLUMN analysis_status TEXT DEFAULT "success"')
+                # 旧行按industries里的标记回填一次，之后查询只走等值条件
+                cursor.execute('''
+                    UPDATE policy_analysis SET analysis_status = 'failed'
+                    WHERE industries LIKE '%分析失败%'
+                ''')
+                cursor.execute('''
+                    UPDATE policy_analysis SET analysis_status = 'empty'
+                    WHERE industries LIKE '%分析后无相关行业%'
+                ''')
+                logger.info("已添加analysis_status字段到policy_analysis表并回填历史状态")
+
+            # 失败/无行业的恢复批任务按状态列等值过滤，替代对JSON文本的LIKE全表扫描
+            cursor.execute('CREATE INDEX IF NOT EXISTS ix_pa_status ON policy_analysis(analysis_status)')
+
+            # policy_id唯一索引：让写入走单条UPSERT，也把按policy_id的
+            # 查找从全表扫描变成索引定位。旧库可能存在重复行，
+            # 先试建索引，撞到重复时保留每个policy_id最新一条再重建。
+            # 必须在行业倒排表回填之前去重，否则倒排索引会混入
+            # 即将被删除的旧分析行的行业
+            try:
+                cursor.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS ux_policy_analysis_policy_id
+                    ON policy_analysis(policy_id)
+                ''')
+            except sqlite3.IntegrityError:
+                logger.info("policy_analysis存在重复policy_id，去重后重建唯一索引")
+                cursor.execute('''
+                    DELETE FROM policy_analysis
+                    WHERE id NOT IN (SELECT MAX(id) FROM policy_analysis GROUP BY policy_id)
+                ''')
+                cursor.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS ux_policy_analysis_policy_id
+                    ON policy_analysis(policy_id)
+                ''')
+
+            # 行业倒排表：按行业查政策从全表LIKE扫描+逐行JSON解析
+            # 变成一次索引等值连接。首次建表时从存量分析结果回填
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='policy_industries'")
+            need_industry_backfill = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS policy_industries (
+                    policy_id INTEGER,
+                    industry TEXT,
+                    PRIMARY KEY (policy_id, industry)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS ix_pi_industry ON policy_industries(industry)')
+            if need_industry_backfill:
+                cursor.execute("SELECT policy_id, industries FROM policy_analysis WHERE industries IS NOT NULL AND industries != ''")
+                backfill_rows = []
+                for pid, blob in cursor.fetchall():
+                    try:
+                        backfill_rows.extend(_industry_index_rows(pid, _json_loads(blob)))
+                    except (ValueError, TypeError):
+                        continue
+                if backfill_rows:
+                    cursor.executemany(
+                        'INSERT OR REPLACE INTO policy_industries (policy_id, industry) VALUES (?, ?)',
+                        backfill_rows
+                    )
+                    logger.info(f"已回填{len(backfill_rows)}条行业倒排索引")
+
+            # AI响应缓存表：按prompt哈希短路重复的API调用
+            # （重复政策、崩溃后重跑、重新分析都会产生完全相同的prompt）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS prompt_cache (
+                    prompt_hash TEXT PRIMARY KEY,
+                    response TEXT,
+                    created_at INTEGER
+                )
+            ''')
+
+            # 存量明文原文回填为zlib BLOB：typeof区分新旧行，
+            # 全部压缩完成后此查询为空，启动时只剩一次轻量扫描
+            cursor.execute('''
+                SELECT policy_id, full_content FROM policy_analysis
+                WHERE typeof(full_content) = 'text' AND full_content != ''
+            ''')
+            legacy_rows = cursor.fetchall()
+            if legacy_rows:
+                cursor.executemany(
+                    'UPDATE policy_analysis SET full_content = ? WHERE policy_id = ?',
+                    [(_compress_content(text), pid) for pid, text in legacy_rows]
+                )
+                logger.info(f"已将{len(legacy_rows)}条存量政策原文压缩为zlib BLOB")
+
+            # 事件详情页的LEFT JOIN和按日期倒序排序所需的索引：
+            # 覆盖索引带上查询要取的三列，命中后不必回表
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_pa_cover
+                ON policy_analysis(policy_id, industries, analysis_summary, confidence_score)
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_pe_date ON policy_events(date DESC)')
+            # 喂给查询计划器最新的分布统计
+            cursor.execute('ANALYZE')
+
             conn.commit()
         logger.info("AI分析结果表初始化完成")
     
@@ -375,10 +864,10 @@ class AIPolicyAnalyzer:
         
         try:
             # 使用旧版本openai API调用
-            full_prompt = "你是一个专业的金融政策分析师，擅长分析政策新闻对股票市场的影响。请根据政策内容分析相关的行业、板块和个股。\n\n" + prompt
+            # prompt模板已内嵌系统提示前缀，这里直接发送
             response = openai.Completion.create(
                 model=self.model,
-                prompt=full_prompt,
+                prompt=prompt,
                 temperature=0.3,
                 max_tokens=2000
             )
@@ -389,69 +878,82 @@ class AIPolicyAnalyzer:
             logger.error(f"API调用失败: {str(e)}")
             raise Exception(str(e))
     
+    def _extract_content_from_html(self, html: str) -> str:
+        """从页面HTML中提取政策正文（同步与异步抓取路径共用）
+
+        大页面的解析是纯CPU工作且一直持有GIL，丢到进程池里跨核并行；
+        小页面进程间传输开销不划算，留在当前进程解析。
+        """
+        if len(html) >= _PARSE_PROCESS_THRESHOLD:
+            try:
+                return _get_parse_pool().submit(_extract_policy_content, html).result()
+            except Exception as e:
+                logger.warning(f"进程池解析失败，回退进程内解析: {str(e)}")
+        return _extract_policy_content(html)
+
     def fetch_policy_content(self, source_url: str) -> str:
         """从政策原文链接抓取完整内容"""
         if not source_url or not source_url.strip():
             return ""
-            
+
+        # 同一URL本次运行内只抓一次
+        cached = self._content_cache.get(source_url)
+        if cached is not None:
+            return cached
+
         try:
             logger.info(f"正在抓取政策原文: {source_url}")
-            
-            # 使用配置的请求头
-            response = requests.get(source_url, headers=Config.DEFAULT_HEADERS, timeout=Config.REQUEST_TIMEOUT)
-            response.encoding = 'utf-8'
-            
-            if response.status_code != 200:
-                logger.warning(f"HTTP状态码异常: {response.status_code}")
-                return ""
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 移除脚本和样式标签
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # 使用配置的内容选择器
-            content_selectors = Config.CONTENT_SELECTORS
-            
-            content_text = ""
-            for selector in content_selectors:
-                try:
-                    content_elem = soup.select_one(selector)
-                    if content_elem:
-                        content_text = content_elem.get_text(separator='\n', strip=True)
-                        if len(content_text) > Config.MIN_CONTENT_LENGTH:  # 确保抓取到足够的内容
-                            logger.info(f"成功抓取内容，长度: {len(content_text)}字符")
-                            return content_text
-                except Exception as e:
-                    continue
-            
-            # 如果没有找到特定容器，尝试从body提取
-            body = soup.find('body')
-            if body:
-                content_text = body.get_text(separator='\n', strip=True)
-                # 过滤掉导航、菜单等无关内容
-                lines = content_text.split('\n')
-                filtered_lines = []
-                for line in lines:
-                    line = line.strip()
-                    if len(line) > 10 and not any(keyword in line for keyword in Config.FILTER_KEYWORDS):
-                        filtered_lines.append(line)
-                
-                content_text = '\n'.join(filtered_lines)
-                
-            if len(content_text) > Config.MIN_CONTENT_LENGTH:
-                logger.info(f"从body提取内容，长度: {len(content_text)}字符")
-                return content_text
-            else:
-                logger.warning(f"抓取的内容过短: {len(content_text)}字符")
-                return ""
-                
-        except requests.exceptions.Timeout:
-            logger.error(f"请求超时: {source_url}")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"请求异常: {source_url}, 错误: {str(e)}")
-        except Exception as e:
+
+            # 便宜的HEAD预检：死链和非HTML资源（附件/图片）不必下载body。
+            # 部分服务器不支持HEAD（405等报错），预检失败就照常走GET
+            try:
+                head = self._session.head(source_url, timeout=3, allow_redirects=True)
+                if head.status_code == 200:
+                    content_type = head.headers.get('Content-Type', '')
+                    if content_type and 'html' not in content_type.lower():
+                        logger.warning(f"非HTML资源({content_type})，跳过抓取: {source_url}")
+                        return ""
+                elif 400 <= head.status_code < 500 and head.status_code != 405:
+                    logger.warning(f"HEAD预检失败(HTTP {head.status_code})，跳过抓取: {source_url}")
+                    return ""
+            except requests.RequestException:
+                pass
+            
+            # 复用带连接池的Session（请求头已在__init__配置）；
+            # stream=True配合限长读取，超大页面不会把整个body拉进内存
+            response = self._session.get(
+                source_url, timeout=Config.REQUEST_TIMEOUT, stream=True
+            )
+            try:
+                if response.status_code != 200:
+                    logger.warning(f"HTTP状态码异常: {response.status_code}")
+                    return ""
+
+                # 声明长度就超限的（多半是附件/二进制）直接放弃，连读都不读
+                content_length = response.headers.get('Content-Length')
+                if content_length and content_length.isdigit() \
+                        and int(content_length) > Config.FETCH_ABORT_BYTES:
+                    logger.warning(f"页面过大({content_length}字节)，跳过抓取: {source_url}")
+                    return ""
+
+                # decode_content让urllib3边读边解gzip/deflate，读满上限即停
+                raw = response.raw
+                raw.decode_content = True
+                data = raw.read(Config.FETCH_SYNC_MAX_BYTES)
+            finally:
+                response.close()
+
+            html = data.decode(response.encoding or 'utf-8', errors='replace')
+            content_text = self._extract_content_from_html(html)
+            if content_text:
+                self._content_cache[source_url] = content_text
+            return content_text
+
+        except requests.exceptions.Timeout:
+            logger.error(f"请求超时: {source_url}")
+        except requests.exceptions.RequestException as e:
+            logger.error(f"请求异常: {source_url}, 错误: {str(e)}")
+        except Exception as e:
             logger.error(f"抓取政策内容失败 {source_url}: {str(e)}")
         
         return ""
@@ -480,30 +982,30 @@ class AIPolicyAnalyzer:
         """
         try:
             # 尝试从原文链接获取完整内容
+            # 已有内容足够长（达到full阈值）时无需再抓取原文；
+            # 本次运行中已抓取失败的URL也直接跳过，避免重复请求失效链接
             full_content = content
-            content_quality = "title_only"
-            
-            if source_url and not content:
-                logger.info(f"尝试从原文链接获取政策内容: {source_url}")
-                full_content = self.fetch_policy_content(source_url)
-                if full_content:
-                    if len(full_content) > Config.FULL_CONTENT_THRESHOLD:
-                        content_quality = "full"
-                    elif len(full_content) > Config.PARTIAL_CONTENT_THRESHOLD:
-                        content_quality = "partial"
-                    else:
-                        content_quality = "title_only"
-            elif content:
-                # 判断现有内容的质量
-                if len(content) > Config.FULL_CONTENT_THRESHOLD:
-                    content_quality = "full"
-                elif len(content) > Config.PARTIAL_CONTENT_THRESHOLD:
-                    content_quality = "partial"
+            need_fetch = (source_url
+                          and (not content or len(content) < Config.FULL_CONTENT_THRESHOLD)
+                          and source_url not in self._url_fail_cache)
+
+            if need_fetch:
+                # 批量预抓取已拿到的内容直接用，没有缓存才同步抓取
+                cached_content = self._content_cache.get(source_url)
+                if cached_content is not None:
+                    full_content = cached_content
                 else:
-                    content_quality = "title_only"
+                    logger.info(f"尝试从原文链接获取政策内容: {source_url}")
+                    fetched_content = self.fetch_policy_content(source_url)
+                    if fetched_content:
+                        full_content = fetched_content
+                    else:
+                        self._url_fail_cache.add(source_url)
+
+            content_quality = self._classify_content_quality(full_content)
             
             # 构建分析prompt
-            has_full_content = full_content and len(full_content) > 50
+            has_full_content = _has_full(full_content)
             prompt = self._build_analysis_prompt(
                 title=title,
                 content=full_content if has_full_content else content,
@@ -562,17 +1064,26 @@ class AIPolicyAnalyzer:
             )
     
     def get_stored_policy_content(self, policy_id: int) -> Optional[str]:
-        """从数据库获取已存储的政策原文内容"""
+        """从数据库获取已存储的政策原文内容（带内存缓存）"""
+        cached = self._stored_content_cache.get(policy_id)
+        if cached is not None:
+            return cached
+
         try:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('SELECT full_content FROM policy_analysis WHERE policy_id = ?', (policy_id,))
                 result = cursor.fetchone()
-                
-                if result and result[0]:
-                    logger.info(f"从数据库获取到政策ID {policy_id} 的原文内容，长度: {len(result[0])}字符")
-                    return result[0]
+
+                content = _decompress_content(result[0]) if result else None
+                if content:
+                    logger.info(f"从数据库获取到政策ID {policy_id} 的原文内容，长度: {len(content)}字符")
+                    # 粗粒度限容：超过1024条时整体清空，避免长进程无限增长
+                    if len(self._stored_content_cache) >= 1024:
+                        self._stored_content_cache.clear()
+                    self._stored_content_cache[policy_id] = content
+                    return content
                 else:
                     logger.info(f"政策ID {policy_id} 没有存储的原文内容")
                 return None
@@ -640,16 +1151,16 @@ class AIPolicyAnalyzer:
                 )
                 
                 if analysis_result:
-                    # 保存重新分析的结果
-                    self.save_analysis_result(policy_id, analysis_result)
+                    # 结果进暂存队列，按阈值合并落库，避免每条都开连接提交
+                    self.queue_analysis_result(policy_id, analysis_result)
                     success_count += 1
                     logger.info(f"政策重新分析完成: {title[:50]}...")
                 else:
                     logger.warning(f"政策重新分析失败: {title[:50]}...")
-                
-                # 减少延迟时间
-                time.sleep(0.5)
-            
+
+            # 批次收尾：把暂存的结果在一个事务里写完
+            self.flush_analysis_results()
+
             logger.info(f"批量重新分析完成，成功处理 {success_count}/{len(policies)} 条政策")
             return success_count
             
@@ -657,62 +1168,174 @@ class AIPolicyAnalyzer:
             logger.error(f"批量重新分析政策时发生错误: {str(e)}")
             return 0
     
+    # policy_id上有唯一索引，单条ON CONFLICT语句代替先SELECT再分支
+    # UPDATE/INSERT的两次往返
+    _UPSERT_ANALYSIS_SQL = '''
+        INSERT INTO policy_analysis
+        (policy_id, industries, analysis_summary, confidence_score, content_quality, full_content, analysis_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(policy_id) DO UPDATE SET
+            industries = excluded.industries,
+            analysis_summary = excluded.analysis_summary,
+            confidence_score = excluded.confidence_score,
+            content_quality = excluded.content_quality,
+            full_content = excluded.full_content,
+            analysis_status = excluded.analysis_status,
+            created_at = CURRENT_TIMESTAMP
+    '''
+
+    def _analysis_row_params(self, policy_id: int, analysis_result: Dict) -> tuple:
+        """构造单条UPSERT的绑定参数（单写与executemany批量写共用）"""
+        # 分析状态落到独立列；无相关行业的成功结果归一为empty状态
+        status = analysis_result.get('analysis_status', 'success')
+        if status == 'success' and analysis_result['industries'] == ["分析后无相关行业"]:
+            status = 'empty'
+
+        # 原文可能被本次写入更新，对应缓存条目失效
+        self._stored_content_cache.pop(policy_id, None)
+        return (
+            policy_id,
+            _encode_industries(analysis_result['industries']),
+            analysis_result['analysis_summary'],
+            analysis_result['confidence_score'],
+            analysis_result.get('content_quality', 'title_only'),
+            _compress_content(analysis_result.get('full_content') or ''),
+            status
+        )
+
+    def _write_analysis_row(self, cursor, policy_id: int, analysis_result: Dict) -> None:
+        """在给定游标上写入单条分析结果（UPSERT，存在即更新）"""
+        cursor.execute(self._UPSERT_ANALYSIS_SQL,
+                       self._analysis_row_params(policy_id, analysis_result))
+        # 同步维护行业倒排表：先清掉旧行，结果变化时不残留过期行业
+        cursor.execute('DELETE FROM policy_industries WHERE policy_id = ?', (policy_id,))
+        cursor.executemany(
+            'INSERT OR REPLACE INTO policy_industries (policy_id, industry) VALUES (?, ?)',
+            _industry_index_rows(policy_id, analysis_result['industries'])
+        )
+        logger.info(f"保存政策ID {policy_id} 的分析结果")
+
     def save_analysis_result(self, policy_id: int, analysis_result: Dict) -> bool:
         """保存分析结果到数据库"""
         try:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
-                
-                # 检查是否已存在分析结果
-                cursor.execute('SELECT id FROM policy_analysis WHERE policy_id = ?', (policy_id,))
-                existing = cursor.fetchone()
-                
-                if existing:
-                    # 更新现有记录
-                    cursor.execute('''
-                        UPDATE policy_analysis 
-                        SET industries = ?, analysis_summary = ?, confidence_score = ?, content_quality = ?, full_content = ?,
-                            created_at = CURRENT_TIMESTAMP
-                        WHERE policy_id = ?
-                    ''', (
-                        json.dumps(analysis_result['industries'], ensure_ascii=False),
-                        analysis_result['analysis_summary'],
-                        analysis_result['confidence_score'],
-                        analysis_result.get('content_quality', 'title_only'),
-                        analysis_result.get('full_content', ''),
-                        policy_id
-                    ))
-                    logger.info(f"更新政策ID {policy_id} 的分析结果")
-                else:
-                    # 插入新记录
-                    cursor.execute('''
-                        INSERT INTO policy_analysis 
-                        (policy_id, industries, analysis_summary, confidence_score, content_quality, full_content)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (
-                        policy_id,
-                        json.dumps(analysis_result['industries'], ensure_ascii=False),
-                        analysis_result['analysis_summary'],
-                        analysis_result['confidence_score'],
-                        analysis_result.get('content_quality', 'title_only'),
-                        analysis_result.get('full_content', '')
-                    ))
-                    logger.info(f"保存政策ID {policy_id} 的分析结果")
-                
+                self._write_analysis_row(cursor, policy_id, analysis_result)
                 conn.commit()
             return True
-            
+
         except Exception as e:
             logger.error(f"保存分析结果失败: {str(e)}")
             return False
+
+    def queue_analysis_result(self, policy_id: int, analysis_result: Dict) -> int:
+        """暂存分析结果，累积到阈值时合并写入数据库
+
+        Returns:
+            本次调用实际落库的条数（未触发flush时为0）
+        """
+        self._pending_writes.append((policy_id, analysis_result))
+        if len(self._pending_writes) >= Config.WRITE_FLUSH_THRESHOLD:
+            return self.flush_analysis_results()
+        return 0
+
+    def flush_analysis_results(self) -> int:
+        """把暂存的分析结果在一个事务中批量写入数据库
+
+        Returns:
+            成功写入的条数
+        """
+        if not self._pending_writes:
+            return 0
+
+        pending, self._pending_writes = self._pending_writes, []
+
+        # 绑定参数在事务外逐条构建：个别畸形结果（缺字段等）只丢弃
+        # 自己这一条，不连累整批其余已付费的AI结果
+        rows = []
+        row_params = []
+        industry_rows = []
+        for policy_id, analysis_result in pending:
+            try:
+                params = self._analysis_row_params(policy_id, analysis_result)
+                index_rows = _industry_index_rows(policy_id, analysis_result['industries'])
+            except Exception as e:
+                logger.error(f"政策ID {policy_id} 的分析结果格式异常，已丢弃: {str(e)}")
+                continue
+            rows.append((policy_id, analysis_result))
+            row_params.append(params)
+            industry_rows.extend(index_rows)
+
+        if not rows:
+            return 0
+
+        try:
+            with self.get_db_connection() as conn:
+                # BEGIN IMMEDIATE在批量开始时就拿写锁，整批N条只有一次fsync；
+                # executemany让语句编译一次、循环留在C层
+                conn.execute('BEGIN IMMEDIATE')
+                conn.executemany(self._UPSERT_ANALYSIS_SQL, row_params)
+                # 行业倒排表随批次一起维护，同一个事务里先删旧行再插新行
+                conn.executemany(
+                    'DELETE FROM policy_industries WHERE policy_id = ?',
+                    [(policy_id,) for policy_id, _ in rows]
+                )
+                conn.executemany(
+                    'INSERT OR REPLACE INTO policy_industries (policy_id, industry) VALUES (?, ?)',
+                    industry_rows
+                )
+                conn.commit()
+            logger.info(f"批量落库{len(rows)}条分析结果")
+            return len(rows)
+
+        except Exception as e:
+            # 写库失败（如SQLITE_BUSY）时把整批放回暂存队列头部，
+            # 等下一次flush重试，而不是直接丢掉整批结果
+            self._pending_writes[:0] = rows
+            logger.error(f"批量保存分析结果失败，{len(rows)}条已放回暂存队列: {str(e)}")
+            return 0
+
+    def save_analysis_results_bulk(self, rows) -> int:
+        """把(policy_id, analysis_result)列表一次性批量落库
+
+        Args:
+            rows: (policy_id, analysis_result)二元组的可迭代对象
+
+        Returns:
+            成功写入的条数（含此前暂存未满阈值的结果）
+        """
+        self._pending_writes.extend(rows)
+        return self.flush_analysis_results()
     
     def analyze_unprocessed_policies(self, limit: int = 10) -> int:
         """
-        批量分析未处理的政策（同步版本，保持向后兼容）
-        
+        批量分析未处理的政策（同步入口）
+
+        内部用asyncio.run驱动异步管线：抓取和AI调用并发进行，
+        批次耗时由串行的Σ(延迟)降到受速率限制约束的并发耗时。
+        当前线程已有事件循环时回退到串行实现。
+
         Args:
             limit: 每次处理的政策数量限制
-            
+
+        Returns:
+            成功分析的政策数量
+        """
+        try:
+            return asyncio.run(self.analyze_unprocessed_policies_async(
+                limit=limit, max_concurrent=Config.DEFAULT_MAX_CALLS
+            ))
+        except RuntimeError:
+            logger.warning("当前线程已有事件循环，回退到串行分析")
+            return self._analyze_unprocessed_policies_serial(limit)
+
+    def _analyze_unprocessed_policies_serial(self, limit: int = 10) -> int:
+        """
+        批量分析未处理的政策（串行实现，事件循环冲突时的回退路径）
+
+        Args:
+            limit: 每次处理的政策数量限制
+
         Returns:
             成功分析的政策数量
         """
@@ -720,23 +1343,32 @@ class AIPolicyAnalyzer:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 获取未分析的政策（包括source_url）
+                # 获取未分析的政策（包括source_url）：
+                # NOT EXISTS反连接走policy_id唯一索引逐条探测，
+                # 不必为LEFT JOIN物化/哈希整张policy_analysis表
                 cursor.execute('''
                     SELECT pe.id, pe.title, pe.content, pe.event_type, pe.source_url
                     FROM policy_events pe
-                    LEFT JOIN policy_analysis pa ON pe.id = pa.policy_id
-                    WHERE pa.policy_id IS NULL
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM policy_analysis pa WHERE pa.policy_id = pe.id
+                    )
                     ORDER BY pe.date DESC
                     LIMIT ?
                 ''', (limit,))
                 
                 policies = cursor.fetchall()
-            
+
+            # 先把整批需要抓原文的URL并发预取，逐条分析时只剩AI调用是网络等待
+            self._prefetch_policy_contents_sync([
+                source_url for _, _, content, _, source_url in policies
+                if source_url and (not content or len(content) < Config.FULL_CONTENT_THRESHOLD)
+            ])
+
             success_count = 0
-            
+
             for policy in policies:
                 policy_id, title, content, event_type, source_url = policy
-                
+
                 logger.info(f"开始分析政策: {title[:50]}...")
                 
                 # 使用完整版本的分析方法
@@ -749,16 +1381,16 @@ class AIPolicyAnalyzer:
                 )
                 
                 if analysis_result:
-                    # 保存分析结果
-                    self.save_analysis_result(policy_id, analysis_result)
+                    # 结果进暂存队列，按阈值合并落库，避免每条都开连接提交
+                    self.queue_analysis_result(policy_id, analysis_result)
                     success_count += 1
                     logger.info(f"政策分析完成: {title[:50]}..., 内容质量: {analysis_result.get('content_quality', 'unknown')}")
                 else:
                     logger.warning(f"政策分析失败: {title[:50]}...")
-                
-                # 批量处理间隔延迟
-                time.sleep(Config.BATCH_DELAY)
-            
+
+            # 批次收尾：把暂存的结果在一个事务里写完
+            self.flush_analysis_results()
+
             return success_count
             
         except Exception as e:
@@ -779,12 +1411,13 @@ class AIPolicyAnalyzer:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 获取需要重新分析的政策：分析失败或无相关行业的
+                # 获取需要重新分析的政策：状态列等值过滤走ix_pa_status索引，
+                # 不再对industries的JSON文本做LIKE全表扫描
                 cursor.execute('''
                     SELECT pe.id, pe.title, pe.content, pe.event_type, pe.source_url, pa.industries
                     FROM policy_events pe
                     JOIN policy_analysis pa ON pe.id = pa.policy_id
-                    WHERE pa.industries LIKE '%分析失败%' OR pa.industries LIKE '%分析后无相关行业%'
+                    WHERE pa.analysis_status IN ('failed', 'empty')
                     ORDER BY pe.date DESC
                     LIMIT ?
                 ''', (limit,))
@@ -794,9 +1427,15 @@ class AIPolicyAnalyzer:
             if not policies:
                 logger.info("没有需要重新分析的政策")
                 return 0
-            
+
+            # 与analyze_unprocessed_policies相同：整批URL并发预取原文
+            self._prefetch_policy_contents_sync([
+                source_url for _, _, content, _, source_url, _ in policies
+                if source_url and (not content or len(content) < Config.FULL_CONTENT_THRESHOLD)
+            ])
+
             success_count = 0
-            
+
             for policy in policies:
                 policy_id, title, content, event_type, source_url, old_industries = policy
                 
@@ -814,23 +1453,23 @@ class AIPolicyAnalyzer:
                 if analysis_result:
                     # 检查新的分析结果是否有改善
                     new_industries = analysis_result.get('industries', [])
-                    if (new_industries and 
-                        "分析失败" not in str(new_industries) and 
+                    if (new_industries and
+                        "分析失败" not in str(new_industries) and
                         "分析后无相关行业" not in str(new_industries)):
-                        # 保存改善的分析结果
-                        self.save_analysis_result(policy_id, analysis_result)
+                        # 暂存改善的分析结果，按阈值合并落库
+                        self.queue_analysis_result(policy_id, analysis_result)
                         success_count += 1
                         logger.info(f"政策重新分析成功: {title[:50]}..., 新行业: {new_industries}")
                     else:
                         # 保存结果，即使仍然是失败或无相关行业
-                        self.save_analysis_result(policy_id, analysis_result)
+                        self.queue_analysis_result(policy_id, analysis_result)
                         logger.info(f"政策重新分析完成但结果未改善: {title[:50]}..., 结果: {new_industries}")
                 else:
                     logger.warning(f"政策重新分析失败: {title[:50]}...")
-                
-                # 减少延迟时间
-                time.sleep(0.8)
-            
+
+            # 批次收尾：把暂存的结果在一个事务里写完
+            self.flush_analysis_results()
+
             logger.info(f"重新分析完成，处理了 {len(policies)} 条政策，其中 {success_count} 条有改善")
             return success_count
             
@@ -851,260 +1490,462 @@ class AIPolicyAnalyzer:
         """
         # 获取未分析的政策
         try:
-            with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT pe.id, pe.title, pe.content, pe.event_type, pe.source_url
-                    FROM policy_events pe
-                    LEFT JOIN policy_analysis pa ON pe.id = pa.policy_id
-                    WHERE pa.policy_id IS NULL
-                    ORDER BY pe.date DESC
-                    LIMIT ?
-                ''', (limit,))
-                
-                policies = cursor.fetchall()
-            
+            def _load_unanalyzed_policies():
+                with self.get_db_connection() as conn:
+                    cursor = conn.cursor()
+
+                    # 同串行路径：NOT EXISTS反连接走policy_id唯一索引。
+                    # 连续多批调用时用键集分页：从上一批扫到的最早日期
+                    # 继续往前翻，不重复探测表头已处理的行
+                    base_query = '''
+                        SELECT pe.id, pe.title, pe.content, pe.event_type, pe.source_url, pe.date
+                        FROM policy_events pe
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM policy_analysis pa WHERE pa.policy_id = pe.id
+                        ){cursor_clause}
+                        ORDER BY pe.date DESC
+                        LIMIT ?
+                    '''
+                    cursor_date = self._unanalyzed_cursor
+                    if cursor_date:
+                        cursor.execute(base_query.format(cursor_clause=' AND pe.date < ?'),
+                                       (cursor_date, limit))
+                    else:
+                        cursor.execute(base_query.format(cursor_clause=''), (limit,))
+                    rows = cursor.fetchall()
+
+                    if not rows and cursor_date:
+                        # 游标之后没有剩余行：回绕一次全量查询，兜住
+                        # 上一批里因异常未落库的行和期间新入库的政策
+                        self._unanalyzed_cursor = None
+                        cursor.execute(base_query.format(cursor_clause=''), (limit,))
+                        rows = cursor.fetchall()
+
+                    if rows:
+                        self._unanalyzed_cursor = min(row[5] for row in rows)
+                    return [tuple(row[:5]) for row in rows]
+
+            # 读操作放到线程中执行，避免阻塞事件循环
+            policies = await asyncio.to_thread(_load_unanalyzed_policies)
+
             if not policies:
                 logger.info("没有需要分析的政策")
                 return 0
             
             logger.info(f"开始异步分析 {len(policies)} 条政策...")
             
-            # 创建信号量限制并发数
-            semaphore = asyncio.Semaphore(max_concurrent)
-            
-            async def analyze_single_policy_async(policy_data):
-                async with semaphore:
-                    policy_id, title, content, event_type, source_url = policy_data
-                    
-                    try:
-                        # 异步获取完整内容
-                        full_content = content or ""
-                        content_quality = "title_only"
-                        
-                        if source_url and not content:
-                            logger.info(f"尝试获取政策完整内容: {title[:50]}...")
-                            full_content = await self.fetch_policy_content_async(source_url)
-                            if full_content:
-                                if len(full_content) > 500:
-                                    content_quality = "full"
-                                elif len(full_content) > 100:
-                                    content_quality = "partial"
-                        elif content:
-                            if len(content) > 500:
-                                content_quality = "full"
-                            elif len(content) > 100:
-                                content_quality = "partial"
-                        
-                        # 构建分析prompt
-                        if full_content and len(full_content) > 50:
-                            prompt = f"""
-请分析以下政策对中国股市的影响：
+            # 自适应并发限制：遇到限流自动收缩，恢复后逐步放开。
+            # 只约束AI调用；抓取用独立的更宽信号量，慢页面不占AI额度
+            limiter = AdaptiveConcurrencyLimiter(max_concurrent)
+            self._concurrency_limiter = limiter
+            fetch_semaphore = asyncio.Semaphore(32)
 
-标题：{title}
-事件类型：{event_type if event_type else '未知'}
-
-完整内容：
-{full_content[:3000]}{'...(内容过长已截断)' if len(full_content) > 3000 else ''}
+            async def analyze_single_policy_async(policy_data):
+                policy_id, title, content, event_type, source_url = policy_data
 
-请从以下几个方面进行分析：
-1. 相关行业：列出可能受到影响的主要行业（最多5个）
-2. 影响程度：评估对股市的整体影响程度（正面/负面/中性）
-3. 分析摘要：基于完整政策内容，详细说明政策的主要影响点和逻辑
-4. 置信度：对分析结果的置信度评分（0-1之间）
+                try:
+                    # 第一阶段：异步获取完整内容（内容足够长或链接已知失效时
+                    # 跳过抓取），受抓取信号量约束，与AI配额队列解耦
+                    full_content = content or ""
+                    need_fetch = (source_url
+                                  and (not content or len(content) < Config.FULL_CONTENT_THRESHOLD)
+                                  and source_url not in self._url_fail_cache)
 
-请以JSON格式返回结果：
-{{
-    "industries": ["行业1", "行业2", ...],
-    "impact_type": "正面/负面/中性",
-    "analysis_summary": "分析摘要",
-    "confidence_score": 0.8
-}}
-"""
+                    if need_fetch:
+                        logger.info(f"尝试获取政策完整内容: {title[:50]}...")
+                        async with fetch_semaphore:
+                            fetched_content = await self.fetch_policy_content_async(source_url)
+                        if fetched_content:
+                            full_content = fetched_content
                         else:
-                            prompt = f"""
-请分析以下政策对中国股市的影响：
+                            self._url_fail_cache.add(source_url)
 
-标题：{title}
-内容：{content if content else '无详细内容'}
-事件类型：{event_type if event_type else '未知'}
-原文链接：{source_url if source_url else '无'}
+                    content_quality = self._classify_content_quality(full_content)
 
-注意：由于缺乏详细政策内容，请基于标题进行初步分析，并在置信度评分中体现这一限制。
+                    # 构建分析prompt（与同步路径共用同一套模板）
+                    has_full_content = _has_full(full_content)
+                    prompt = self._build_analysis_prompt(
+                        title=title,
+                        content=full_content if has_full_content else content,
+                        event_type=event_type,
+                        source_url=source_url,
+                        has_full_content=has_full_content
+                    )
 
-请从以下几个方面进行分析：
-1. 相关行业：列出可能受到影响的主要行业（最多5个）
-2. 影响程度：评估对股市的整体影响程度（正面/负面/中性）
-3. 分析摘要：简要说明政策的主要影响点和逻辑
-4. 置信度：对分析结果的置信度评分（0-1之间，由于缺乏详细内容应适当降低）
 
-请以JSON格式返回结果：
-{{
-    "industries": ["行业1", "行业2", ...],
-    "impact_type": "正面/负面/中性",
-    "analysis_summary": "分析摘要",
-    "confidence_score": 0.5
-}}
-"""
-                        
-                        # 异步调用AI API
+                    # 第二阶段：AI调用，只有这段占用自适应并发额度
+                    async with limiter:
                         api_result = await self.call_ai_api_async(prompt)
-                        
-                        if not api_result:
-                            return None
-                        
-                        # 解析AI回复
-                        ai_response = api_result['choices'][0]['text']
-                        
-                        try:
-                            # 提取JSON部分
-                            start_idx = ai_response.find('{')
-                            end_idx = ai_response.rfind('}') + 1
-                            
-                            if start_idx != -1 and end_idx != -1:
-                                json_str = ai_response[start_idx:end_idx]
-                                result = json.loads(json_str)
-                            else:
-                                result = json.loads(ai_response)
-                            
-                            # 确保返回结果包含所需字段
-                            analysis_result = {
-                                'industries': result.get('industries', []),
-                                'impact_type': result.get('impact_type', '中性'),
-                                'analysis_summary': result.get('analysis_summary', ''),
-                                'confidence_score': float(result.get('confidence_score', 0.5)),
-                                'content_quality': content_quality
-                            }
-                            
-                            logger.info(f"政策分析完成: {title[:50]}..., 内容质量: {content_quality}")
-                            return (policy_id, analysis_result)
-                            
-                        except (json.JSONDecodeError, KeyError, ValueError) as e:
-                            logger.error(f"解析AI回复失败 {title[:50]}...: {str(e)}")
-                            return None
+
+                    if not api_result:
+                        # 与同步路径一致：失败也落库，避免下轮重复分析
+                        return (policy_id, self._create_failed_response(
+                            reason="API调用失败，无法进行分析",
+                            content_quality=content_quality,
+                            full_content=full_content or ''
+                        ))
+
+                    # 解析AI回复
+                    ai_response = api_result['choices'][0]['text']
+
+                    try:
+                        # 提取JSON部分：与同步路径共用同一个提取函数
+                        result = _extract_json_object(ai_response)
+
+                        # 确保返回结果包含所需字段（字段语义与同步路径对齐）
+                        industries = result.get('industries', [])
+                        if not industries:
+                            industries = ["分析后无相关行业"]
+
+                        analysis_result = {
+                            'industries': industries,
+                            'impact_type': result.get('impact_type', '中性'),
+                            'analysis_summary': result.get('analysis_summary', ''),
+                            'confidence_score': float(result.get('confidence_score', 0.5)),
+                            'content_quality': content_quality,
+                            'full_content': full_content or '',
+                            'analysis_status': 'success'
+                        }
+
+                        logger.info(f"政策分析完成: {title[:50]}..., 内容质量: {content_quality}")
+                        return (policy_id, analysis_result)
+
+                    except (json.JSONDecodeError, KeyError, ValueError) as e:
+                        logger.error(f"解析AI回复失败 {title[:50]}...: {str(e)}")
+                        return (policy_id, self._create_failed_response(
+                            reason="AI返回结果解析失败",
+                            content_quality=content_quality,
+                            full_content=full_content or ''
+                        ))
                             
-                    except Exception as e:
-                        logger.error(f"分析政策失败 {title[:50]}...: {str(e)}")
-                        return None
+                except Exception as e:
+                    logger.error(f"分析政策失败 {title[:50]}...: {str(e)}")
+                    return None
             
             # 创建分析任务
             tasks = [analyze_single_policy_async(policy) for policy in policies]
-            
-            # 并发执行分析任务
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # 保存成功的分析结果
+
+            # 边完成边落库：按完成顺序收集结果，攒够一个写入阈值就交给
+            # 写线程批量落库，磁盘写入与仍在途的AI调用重叠；
+            # worker内部已兜住异常（返回None），这里不再逐项isinstance分派
             success_count = 0
-            
-            for result in results:
-                if isinstance(result, tuple) and result is not None:
-                    policy_id, analysis_result = result
-                    if self.save_analysis_result(policy_id, analysis_result):
-                        success_count += 1
-            
+            batch = []
+            loop = asyncio.get_running_loop()
+
+            async def _flush_batch():
+                nonlocal success_count
+                if batch:
+                    rows = list(batch)
+                    batch.clear()
+                    success_count += await loop.run_in_executor(
+                        self._db_writer, self.save_analysis_results_bulk, rows
+                    )
+
+            for next_result in asyncio.as_completed(tasks):
+                try:
+                    result = await next_result
+                except Exception as e:
+                    logger.error(f"分析任务异常: {str(e)}")
+                    continue
+                if result is not None:
+                    batch.append(result)
+                    if len(batch) >= Config.WRITE_FLUSH_THRESHOLD:
+                        await _flush_batch()
+
+            await _flush_batch()
+
             logger.info(f"异步批次分析完成，成功分析并保存 {success_count} 条政策")
             return success_count
-            
+
         except Exception as e:
             logger.error(f"异步批量分析政策时发生错误: {str(e)}")
             return 0
+        finally:
+            self._concurrency_limiter = None
+            # asyncio.run入口的事件循环即将销毁，共享会话必须随批次关闭
+            await self.close()
     
-    async def fetch_policy_content_async(self, source_url: str) -> Optional[str]:
+    async def _get_aio_session(self) -> aiohttp.ClientSession:
+        """获取共享的aiohttp会话，没有或事件循环已更换时重建
+
+        连接池上限64（单主机32），DNS解析结果缓存5分钟，
+        keep-alive连接在整个批次内复用。
+        """
+        loop = asyncio.get_running_loop()
+        if (self._aio_session is None or self._aio_session.closed
+                or self._aio_session_loop is not loop):
+            # 旧循环里创建的会话无法在当前循环安全关闭，直接丢弃，
+            # 底层连接由GC回收（正常流程下入口函数会在循环结束前close）
+            # 连接器不关证书校验：政策页抓取在各自请求上显式传ssl=False
+            # （政府网站证书链常有问题），API调用保持默认的TLS校验
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=64, limit_per_host=32, ttl_dns_cache=300
+                ),
+                headers=Config.DEFAULT_HEADERS,
+                timeout=self._api_timeout
+            )
+            self._aio_session_loop = loop
+        return self._aio_session
+
+    async def close(self) -> None:
+        """关闭共享的aiohttp会话（批次入口在事件循环结束前调用）"""
+        if (self._aio_session is not None and not self._aio_session.closed
+                and self._aio_session_loop is asyncio.get_running_loop()):
+            await self._aio_session.close()
+        self._aio_session = None
+        self._aio_session_loop = None
+
+    async def fetch_policy_content_async(self, source_url: str,
+                                         session: Optional[aiohttp.ClientSession] = None) -> Optional[str]:
         """
         异步获取政策完整内容
-        
+
         Args:
             source_url: 政策原文链接
-            
+            session: 可复用的ClientSession；不传时使用实例共享会话，
+                     连接池和TLS握手在所有异步请求间复用
+
         Returns:
             政策完整内容或None
         """
         if not source_url:
             return None
-        
+
+        if session is None:
+            session = await self._get_aio_session()
+
+        # 便宜的HEAD预检（与同步路径同一套规则）：死链、非HTML资源和
+        # 声明长度超限的附件不必进GET重试循环。不支持HEAD的服务器
+        # （405等）或预检超时就照常走GET
         try:
-            timeout = aiohttp.ClientTimeout(total=60)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(source_url, ssl=False) as response:
+            async with session.head(source_url, allow_redirects=True, ssl=False,
+                                    timeout=aiohttp.ClientTimeout(total=3)) as head_resp:
+                if head_resp.status == 200:
+                    content_type = head_resp.headers.get('Content-Type', '')
+                    if content_type and 'html' not in content_type.lower():
+                        logger.warning(f"非HTML资源({content_type})，跳过抓取: {source_url}")
+                        return None
+                    content_length = head_resp.headers.get('Content-Length')
+                    if content_length and content_length.isdigit() \
+                            and int(content_length) > Config.FETCH_ABORT_BYTES:
+                        logger.warning(f"页面过大({content_length}字节)，跳过抓取: {source_url}")
+                        return None
+                elif 400 <= head_resp.status < 500 and head_resp.status != 405:
+                    logger.warning(f"HEAD预检失败(HTTP {head_resp.status})，跳过抓取: {source_url}")
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+        for attempt in range(Config.FETCH_MAX_RETRIES):
+            try:
+                async with session.get(source_url, ssl=False,
+                                       timeout=self._fetch_timeout) as response:
                     if response.status == 200:
-                        content = await response.text()
-                        # 简单的内容提取（实际应用中可能需要更复杂的解析）
-                        if len(content) > 100:
-                            return content[:3000]  # 限制内容长度
+                        # 限量读取：一次read到字节上限即停，不为3000字符的
+                        # 目标读入整个大页面（gzip由aiohttp自动解压，
+                        # 上限作用在解压后的字节上）
+                        raw = await response.content.read(Config.FETCH_MAX_BYTES)
+                        html = raw.decode(
+                            response.charset or 'utf-8', errors='replace'
+                        )
+                        # 正文提取是CPU密集的解析工作，丢到线程池执行，
+                        # 不让BeautifulSoup阻塞事件循环里的其他抓取
+                        loop = asyncio.get_running_loop()
+                        content = await loop.run_in_executor(
+                            None, self._extract_content_from_html, html
+                        )
+                        return content or None
+
+                    # 对429/5xx进行重试，优先遵循Retry-After头
+                    if response.status == 429 or 500 <= response.status < 600:
+                        if attempt == Config.FETCH_MAX_RETRIES - 1:
+                            logger.warning(f"异步获取政策内容失败 {source_url}: HTTP {response.status}")
+                            return None
+                        retry_after = response.headers.get('Retry-After')
+                        if retry_after and retry_after.isdigit():
+                            delay = float(retry_after)
+                        else:
+                            delay = _backoff_delay(attempt)
+                        logger.warning(f"HTTP {response.status}，{delay:.2f}秒后重试获取 {source_url}")
+                        await asyncio.sleep(delay)
+                        continue
+
                     return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == Config.FETCH_MAX_RETRIES - 1:
+                    logger.warning(f"异步获取政策内容失败 {source_url}: {str(e)}")
+                    return None
+                await asyncio.sleep(_backoff_delay(attempt))
+            except Exception as e:
+                logger.warning(f"异步获取政策内容失败 {source_url}: {str(e)}")
+                return None
+
+        return None
+
+    async def _prefetch_policy_contents(self, urls, max_concurrent: int = 10) -> None:
+        """并发预抓取一批政策原文，结果写入内存缓存
+
+        共享一个ClientSession（复用连接池），信号量限制在max_concurrent个
+        并发请求，网络等待时间相互重叠。抓取成功的URL进_content_cache，
+        失败的进_url_fail_cache，后续逐条分析直接取缓存，不再串行等网络。
+        """
+        pending = [u for u in urls
+                   if u and u not in self._content_cache and u not in self._url_fail_cache]
+        if not pending:
+            return
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+        session = await self._get_aio_session()
+
+        async def _fetch_one(url):
+            async with semaphore:
+                return url, await self.fetch_policy_content_async(url, session=session)
+
+        results = await asyncio.gather(
+            *(_fetch_one(url) for url in pending), return_exceptions=True
+        )
+
+        for item in results:
+            if not isinstance(item, tuple):
+                continue
+            url, content = item
+            if content:
+                self._content_cache[url] = content
+            else:
+                self._url_fail_cache.add(url)
+
+    async def _prefetch_and_close(self, urls, max_concurrent: int) -> None:
+        """预抓取后关闭共享会话（asyncio.run的循环随即销毁，不能留活连接）"""
+        try:
+            await self._prefetch_policy_contents(urls, max_concurrent=max_concurrent)
+        finally:
+            await self.close()
+
+    def _prefetch_policy_contents_sync(self, urls, max_concurrent: int = 10) -> None:
+        """同步入口的批量预抓取封装，内部用asyncio.run驱动"""
+        try:
+            asyncio.run(self._prefetch_and_close(urls, max_concurrent))
+        except RuntimeError:
+            # 已处于事件循环内时退化为不预抓取，由逐条路径按需抓取
+            logger.warning("当前线程已有事件循环，跳过批量预抓取")
         except Exception as e:
-            logger.warning(f"异步获取政策内容失败 {source_url}: {str(e)}")
-            return None
+            logger.warning(f"批量预抓取政策原文失败: {str(e)}")
     
+    def _get_cached_api_response(self, prompt_hash: str) -> Optional[Dict]:
+        """查询prompt缓存，命中且未过期时返回已解析的API响应"""
+        try:
+            with self.get_db_connection() as conn:
+                row = conn.execute(
+                    'SELECT response, created_at FROM prompt_cache WHERE prompt_hash = ?',
+                    (prompt_hash,)
+                ).fetchone()
+            if row is None or time.time() - row[1] > Config.PROMPT_CACHE_TTL:
+                return None
+            return _json_loads(row[0])
+        except Exception as e:
+            logger.warning(f"查询prompt缓存失败: {str(e)}")
+            return None
+
+    def _store_api_response(self, prompt_hash: str, result: Dict) -> None:
+        """把成功的API响应写入prompt缓存"""
+        try:
+            with self.get_db_connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO prompt_cache (prompt_hash, response, created_at) VALUES (?, ?, ?)',
+                    (prompt_hash, json.dumps(result, ensure_ascii=False,
+                                             separators=(',', ':')), int(time.time()))
+                )
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"写入prompt缓存失败: {str(e)}")
+
     async def call_ai_api_async(self, prompt: str, max_retries: int = 3) -> Optional[Dict]:
         """
-        异步调用AI API（带重试机制）
-        
+        异步调用AI API（带重试机制，相同prompt命中本地缓存时不发请求）
+
         Args:
             prompt: 分析提示词
             max_retries: 最大重试次数
-            
+
         Returns:
             API响应结果或None
         """
+        # 相同prompt直接命中SQLite缓存（毫秒级），不占速率限制额度
+        loop = asyncio.get_running_loop()
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        cached = await loop.run_in_executor(
+            self._db_writer, self._get_cached_api_response, prompt_hash
+        )
+        if cached is not None:
+            logger.info("prompt缓存命中，跳过API调用")
+            return cached
+
         # 应用速率限制
         await self.rate_limiter.wait_if_needed()
-        
-        url = "https://api.siliconflow.cn/v1/completions"
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # 合并系统提示和用户提示
-        full_prompt = "你是一个专业的金融政策分析师，擅长分析政策新闻对股票市场的影响。请根据政策内容分析相关的行业、板块和个股。\n\n" + prompt
-        
-        data = {
-            "model": self.model,
-            "prompt": full_prompt,
-            "temperature": 0.3,
-            "max_tokens": 2000
-        }
-        
+
+        # URL、请求头、body骨架和超时配置均已在__init__中缓存，这里只合并prompt
+        data = {**self._api_body_base, "prompt": prompt}
+
+        # 共享会话：连接在批次内保持keep-alive，重试也不付握手成本
+        session = await self._get_aio_session()
+
         for attempt in range(max_retries):
             try:
-                # 增加超时配置
-                timeout = aiohttp.ClientTimeout(
-                    total=120,  # 总超时时间
-                    connect=10,  # 连接超时
-                    sock_read=90  # 读取超时
-                )
-                
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(url, headers=headers, json=data) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            return result
+                async with session.post(self._api_url, headers=self._api_headers, json=data) as response:
+                    if response.status == 200:
+                        # 直接对原始字节解析（orjson可用时走C实现），
+                        # 跳过response.json()内部多余的charset探测和str解码
+                        result = _json_loads(await response.read())
+                        # 服务端配额头校准本地速率窗口，吃满配额又不超发
+                        self.rate_limiter.update_from_headers(response.headers)
+                        if self._concurrency_limiter is not None:
+                            await self._concurrency_limiter.note_success()
+                        await loop.run_in_executor(
+                            self._db_writer, self._store_api_response, prompt_hash, result
+                        )
+                        return result
+                    else:
+                        error_text = await response.text()
+                        error_msg = f"HTTP {response.status}: {error_text[:200]}"
+                        logger.error(f"异步API调用失败，状态码: {response.status}, 响应: {error_text[:200]}")
+
+                        # 限流/服务器错误反馈给批次的并发限制器收缩上限
+                        if (self._concurrency_limiter is not None
+                                and (response.status == 429 or 500 <= response.status < 600)):
+                            await self._concurrency_limiter.throttle()
+
+                        if attempt == max_retries - 1:
+                            return None
+
+                        # 429按Retry-After头指示的时间等待后重试，
+                        # 不用指数退避叠加随机量造成重试踩踏
+                        if response.status == 429:
+                            retry_after = response.headers.get('Retry-After')
+                            if retry_after and retry_after.isdigit():
+                                delay = float(retry_after)
+                            else:
+                                delay = _backoff_delay(attempt)
+                            logger.warning(f"触发限流，{delay:.2f}秒后重试 (第{attempt+1}次)")
+                            await asyncio.sleep(delay)
+                            continue
+
+                        # 对于5xx错误进行重试
+                        if 500 <= response.status < 600:
+                            delay = _backoff_delay(attempt)
+                            logger.warning(f"服务器错误，{delay:.2f}秒后重试 (第{attempt+1}次)")
+                            await asyncio.sleep(delay)
+                            continue
                         else:
-                            error_text = await response.text()
-                            error_msg = f"HTTP {response.status}: {error_text[:200]}"
-                            logger.error(f"异步API调用失败，状态码: {response.status}, 响应: {error_text[:200]}")
-                            
-                            if attempt == max_retries - 1:
-                                return None
+                            return None
                             
-                            # 对于5xx错误进行重试
-                            if 500 <= response.status < 600:
-                                delay = Config.BASE_DELAY ** attempt + random.uniform(0, 1)
-                                logger.warning(f"服务器错误，{delay:.2f}秒后重试 (第{attempt+1}次)")
-                                await asyncio.sleep(delay)
-                                continue
-                            else:
-                                return None
-                                
             except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                 if attempt == max_retries - 1:
                     logger.error(f"异步API调用失败，已重试{max_retries}次: {str(e)}")
                     return None
                 
                 # 指数退避
-                delay = min(2 ** attempt + random.uniform(0, 1), 30)
+                delay = _backoff_delay(attempt)
                 logger.warning(f"异步API调用异常，{delay:.2f}秒后重试 (第{attempt+1}次): {str(e)}")
                 await asyncio.sleep(delay)
                 
@@ -1130,7 +1971,7 @@ class AIPolicyAnalyzer:
                 
                 if result:
                     return {
-                        'industries': json.loads(result[0]) if result[0] else [],
+                        'industries': _json_loads(result[0]) if result[0] else [],
                         'analysis_summary': result[1],
                         'confidence_score': result[2],
                         'content_quality': result[3] if result[3] else 'title_only',
@@ -1144,40 +1985,33 @@ class AIPolicyAnalyzer:
             return None
     
     def get_policies_by_stock(self, stock_code: str) -> List[Dict]:
-        """根据股票代码查找相关政策"""
+        """根据股票代码/行业名查找相关政策
+
+        走policy_industries倒排表的索引等值连接，代替原来对
+        policy_analysis.industries的全表LIKE扫描加逐行JSON解析。
+        """
         try:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
-                
+
                 cursor.execute('''
                     SELECT pe.id, pe.title, pe.date, pe.event_type, pa.industries, pa.analysis_summary
-                    FROM policy_events pe
-                    JOIN policy_analysis pa ON pe.id = pa.policy_id
-                    WHERE pa.industries LIKE ?
+                    FROM policy_industries pi
+                    JOIN policy_events pe ON pe.id = pi.policy_id
+                    JOIN policy_analysis pa ON pa.policy_id = pi.policy_id
+                    WHERE pi.industry = ?
                     ORDER BY pe.date DESC
-                ''', (f'%{stock_code}%',))
-                
-                results = cursor.fetchall()
-                policies = []
-                
-                for result in results:
-                    try:
-                        industries = json.loads(result[4]) if result[4] else []
-                        # 检查是否包含相关行业
-                        if any(stock_code in str(industry) for industry in industries):
-                            policies.append({
-                                'id': result[0],
-                                'title': result[1],
-                                'date': result[2],
-                                'event_type': result[3],
-                                'industries': industries,
-                                'analysis_summary': result[5]
-                            })
-                    except json.JSONDecodeError:
-                        continue
-                
-                return policies
-                
+                ''', (stock_code,))
+
+                return [{
+                    'id': result[0],
+                    'title': result[1],
+                    'date': result[2],
+                    'event_type': result[3],
+                    'industries': _json_loads(result[4]) if result[4] else [],
+                    'analysis_summary': result[5]
+                } for result in cursor.fetchall()]
+
         except Exception as e:
             logger.error(f"查询股票相关政策失败: {str(e)}")
             return []
@@ -1187,32 +2021,21 @@ class AIPolicyAnalyzer:
         try:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
-                
-                # 统计总政策数
-                cursor.execute('SELECT COUNT(*) FROM policy_events')
-                total_policies = cursor.fetchone()[0]
-                
-                # 统计已分析政策数
-                cursor.execute('SELECT COUNT(*) FROM policy_analysis')
-                analyzed_policies = cursor.fetchone()[0]
-                
-                # 统计分析失败的政策数
-                cursor.execute("SELECT COUNT(*) FROM policy_analysis WHERE industries LIKE '%分析失败%'")
-                failed_analysis = cursor.fetchone()[0]
-                
-                # 统计无相关行业的政策数
-                cursor.execute("SELECT COUNT(*) FROM policy_analysis WHERE industries LIKE '%分析后无相关行业%'")
-                no_industry_analysis = cursor.fetchone()[0]
-                
-                # 统计成功分析且有相关行业的政策数
-                cursor.execute("""
-                    SELECT COUNT(*) FROM policy_analysis 
-                    WHERE industries NOT LIKE '%分析失败%' 
-                    AND industries NOT LIKE '%分析后无相关行业%'
-                    AND industries != '[]'
-                """)
-                successful_analysis = cursor.fetchone()[0]
-                
+
+                # 五个计数并成一次扫描：成功/失败/无行业按analysis_status
+                # 条件聚合（该列建库时已回填并建索引），总政策数用标量
+                # 子查询捎带取出，不再对两张表各扫五遍
+                cursor.execute('''
+                    SELECT (SELECT COUNT(*) FROM policy_events),
+                           COUNT(*),
+                           COALESCE(SUM(analysis_status = 'failed'), 0),
+                           COALESCE(SUM(analysis_status = 'empty'), 0),
+                           COALESCE(SUM(analysis_status = 'success'), 0)
+                    FROM policy_analysis
+                ''')
+                (total_policies, analyzed_policies, failed_analysis,
+                 no_industry_analysis, successful_analysis) = cursor.fetchone()
+
                 # 统计未分析的政策数
                 unanalyzed_policies = total_policies - analyzed_policies
                 
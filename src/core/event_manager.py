@@ -8,46 +8,138 @@ import sqlite3
 import csv
 import io
 import json
+import atexit
+import threading
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import itemgetter
 from flask import jsonify, request
 from werkzeug.utils import secure_filename
 import os
 from contextlib import contextmanager
 
+# 错误明细最多保留的条数：坏文件上传时错误行可能数以万计，
+# 不能让errors列表随文件无限增长
+_MAX_IMPORT_ERRORS = 100
+
+# 导入字段及其在INSERT语句中的顺序（created_at在行尾追加）
+_CSV_FIELDS = ('date', 'title', 'content_type', 'event_type', 'department',
+               'policy_level', 'impact_level', 'industries', 'content',
+               'ai_analysis', 'source_url')
+
+_INSERT_POLICY_SQL = """
+    INSERT OR IGNORE INTO policy_events (
+        date, title, content_type, event_type, department,
+        policy_level, impact_level, industries, content,
+        ai_analysis, source_url, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# policy_events新增行时由触发器同步写入events表，Python侧不再做第二次INSERT。
+# 必须是TEMP触发器（连接级）：只有事件管理模块的手工创建/CSV导入需要镜像，
+# 若建成库级触发器，抓取器的保存和migrate_old_events的迁移插入也会被镜像，
+# 后者会把events的存量行原样复制回去造成整表翻倍
+_SYNC_EVENTS_TRIGGER_SQL = """
+    CREATE TEMP TRIGGER IF NOT EXISTS trg_policy_to_events
+    AFTER INSERT ON policy_events
+    BEGIN
+        INSERT INTO events (date, title, event_type, created_at)
+        VALUES (NEW.date, NEW.title, NEW.event_type, NEW.created_at);
+    END
+"""
+
+
 class EventManager:
     def __init__(self, db_path='events.db'):
         self.db_path = db_path
-    
+        self._local = threading.local()
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        """创建删除事件所需的索引和导入去重用的唯一索引"""
+        try:
+            with self.get_db_connection() as conn:
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_events_title_date ON events(title, date)'
+                )
+                try:
+                    # 导入去重靠这条唯一索引 + INSERT OR IGNORE在引擎层完成，
+                    # 不需要逐行SELECT预检
+                    conn.execute(
+                        'CREATE UNIQUE INDEX IF NOT EXISTS ux_policy_events_dedup '
+                        "ON policy_events(date, title, coalesce(source_url, ''))"
+                    )
+                except sqlite3.IntegrityError:
+                    # 存量数据已有重复行时建不了唯一索引，保持原有行为
+                    pass
+                # 清理历史版本误建的库级触发器（schema限定main，
+                # 避免把当前连接的同名TEMP触发器删掉）
+                conn.execute('DROP TRIGGER IF EXISTS main.trg_policy_to_events')
+                conn.commit()
+        except sqlite3.OperationalError:
+            # 数据表尚未创建（首次启动时由数据库初始化负责建表）
+            pass
+
+
+    def _get_thread_connection(self):
+        """获取当前线程的长连接，首次使用时创建并应用PRAGMA"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # cached_statements调高到256，让两张表的全部增删语句都留在
+            # sqlite3内部的预编译语句缓存里
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            # 批量写入场景下的标准SQLite调优：WAL减少写锁冲突，
+            # synchronous=NORMAL在WAL下足够安全且大幅减少fsync
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA cache_size=-65536')
+            try:
+                # events镜像行交给触发器在同一次B树下降里完成，
+                # 本模块的各插入路径减少一半Python到SQLite的往返
+                conn.execute(_SYNC_EVENTS_TRIGGER_SQL)
+            except sqlite3.OperationalError:
+                # 数据表尚未创建（首次启动时由数据库初始化负责建表）
+                pass
+            self._local.conn = conn
+        return conn
+
     @contextmanager
     def get_db_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
+        """获取数据库连接的上下文管理器
+
+        连接按线程缓存复用，避免每次API调用重复支付connect/close
+        和页缓存预热的开销；异常时回滚当前事务但保留连接。
+        """
+        conn = self._get_thread_connection()
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
             yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
+            conn.rollback()
             raise e
-        finally:
-            if conn:
-                conn.close()
+
+    def close_connections(self):
+        """关闭当前线程缓存的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
     def create_single_event(self, event_data):
         """创建单个事件"""
         try:
+            # 两张表共用同一个创建时间戳，只取一次
+            now_iso = datetime.now().isoformat()
+
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
-                
+
                 # 插入到policy_events表
-                cursor.execute("""
-                    INSERT INTO policy_events (
-                        date, title, content_type, event_type, department, 
-                        policy_level, impact_level, industries, content, 
-                        ai_analysis, source_url, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+                cursor.execute(_INSERT_POLICY_SQL, (
                     event_data['date'],
                     event_data['title'],
                     event_data.get('content_type', ''),
@@ -59,93 +151,108 @@ class EventManager:
                     event_data.get('content', ''),
                     event_data.get('ai_analysis', ''),
                     event_data.get('source_url', ''),
-                    datetime.now().isoformat()
-                ))
-                
-                # 插入到events表（用于K线图显示）
-                cursor.execute("""
-                    INSERT INTO events (date, title, event_type, created_at)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    event_data['date'],
-                    event_data['title'],
-                    event_data.get('event_type', ''),
-                    datetime.now().isoformat()
+                    now_iso
                 ))
-                
+                # events表（K线图显示用）由trg_policy_to_events触发器同步写入
+
+                # OR IGNORE吞掉重复行时rowcount为0，如实告知用户而不是谎报成功
+                duplicated = cursor.rowcount == 0
+
                 conn.commit()
-                
+
+            if duplicated:
+                return {'success': False, 'message': '创建事件失败: 相同的事件已存在'}
             return {'success': True, 'message': '事件创建成功'}
             
         except Exception as e:
             return {'success': False, 'message': f'创建事件失败: {str(e)}'}
     
     def import_events_from_csv(self, csv_content):
-        """从CSV内容批量导入事件"""
+        """从CSV字符串批量导入事件（兼容入口，内部走流式实现）"""
+        return self.import_events_from_stream(io.StringIO(csv_content))
+
+    def import_events_from_stream(self, text_stream):
+        """从文本流批量导入事件
+
+        逐行消费csv.DictReader，整个导入过程内存占用只有
+        一批缓冲行，而不是整份文件的字符串拷贝。
+        """
         try:
-            # 解析CSV内容
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
-            
-            with self.get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                success_count = 0
-                error_count = 0
-                errors = []
-                
+            # 用csv.reader按位取值：DictReader每行都要建一个dict，
+            # 循环里再做12次row.get哈希查找，大文件导入时开销可观
+            csv_reader = csv.reader(text_stream)
+            header = next(csv_reader, None)
+            col_index = {name.strip(): i for i, name in enumerate(header or [])}
+
+            if 'date' not in col_index or 'title' not in col_index:
+                return {'success': False, 'message': '导入失败: CSV缺少date或title列'}
+
+            # 每个目标字段的列号预先算好；全部列都在时走itemgetter快路径
+            positions = tuple(col_index.get(field) for field in _CSV_FIELDS)
+            if None not in positions:
+                fast_getter = itemgetter(*positions)
+                max_pos = max(positions)
+            else:
+                fast_getter = None
+                max_pos = -1
+
+            # 时间戳整批只取一次，避免每行两次datetime.now()调用
+            now_iso = datetime.now().isoformat()
+
+            success_count = 0
+            error_count = 0
+            errors = []
+
+            def _iter_rows():
+                """逐行校验并产出插入元组
+
+                executemany边拉边写，整个导入过程不在Python侧
+                物化任何行列表，峰值内存与文件大小无关。
+                """
+                nonlocal success_count, error_count
                 for row_num, row in enumerate(csv_reader, start=2):  # 从第2行开始（第1行是标题）
-                    try:
-                        # 验证必填字段
-                        if not row.get('date') or not row.get('title'):
+                    if fast_getter is not None and len(row) > max_pos:
+                        values = fast_getter(row)
+                    else:
+                        # 缺列或行被截短时逐字段补''
+                        row_len = len(row)
+                        values = tuple(
+                            row[i] if i is not None and i < row_len else ''
+                            for i in positions
+                        )
+
+                    # 验证必填字段（明细有上限，计数照常累加）
+                    if not values[0] or not values[1]:
+                        if error_count < _MAX_IMPORT_ERRORS:
                             errors.append(f'第{row_num}行: 日期和标题为必填字段')
-                            error_count += 1
-                            continue
-                        
-                        # 插入到policy_events表
-                        cursor.execute("""
-                            INSERT INTO policy_events (
-                                date, title, content_type, event_type, department, 
-                                policy_level, impact_level, industries, content, 
-                                ai_analysis, source_url, created_at
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            row['date'],
-                            row['title'],
-                            row.get('content_type', ''),
-                            row.get('event_type', ''),
-                            row.get('department', ''),
-                            row.get('policy_level', ''),
-                            row.get('impact_level', ''),
-                            row.get('industries', ''),
-                            row.get('content', ''),
-                            row.get('ai_analysis', ''),
-                            row.get('source_url', ''),
-                            datetime.now().isoformat()
-                        ))
-                        
-                        # 插入到events表
-                        cursor.execute("""
-                            INSERT INTO events (date, title, event_type, created_at)
-                            VALUES (?, ?, ?, ?)
-                        """, (
-                            row['date'],
-                            row['title'],
-                            row.get('event_type', ''),
-                            datetime.now().isoformat()
-                        ))
-                        
-                        success_count += 1
-                        
-                    except Exception as e:
-                        errors.append(f'第{row_num}行: {str(e)}')
                         error_count += 1
-                
+                        continue
+
+                    success_count += 1
+                    yield values + (now_iso,)
+
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+
+                # 单个事务内流式写入；INSERT OR IGNORE在引擎层丢弃重复行，
+                # rowcount只统计实际落库的行数，差值即被去重的条数；
+                # events镜像行由触发器随插入一并写入
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.executemany(_INSERT_POLICY_SQL, _iter_rows())
+                duplicate_count = success_count - cursor.rowcount
                 conn.commit()
-            
+
+            # 去重丢弃的行不计入成功数
+            success_count -= duplicate_count
+
+            if error_count > _MAX_IMPORT_ERRORS:
+                errors.append(f'（错误过多，仅保留前{_MAX_IMPORT_ERRORS}条明细）')
+
             return {
                 'success': True,
-                'message': f'导入完成: 成功{success_count}条，失败{error_count}条',
+                'message': f'导入完成: 成功{success_count}条，失败{error_count}条，重复跳过{duplicate_count}条',
                 'success_count': success_count,
+                'duplicate_count': duplicate_count,
                 'error_count': error_count,
                 'errors': errors
             }
@@ -158,17 +265,21 @@ class EventManager:
         try:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
-                
+
+                # 先查出标题和日期，再按(title, date)精确删除events表中的记录：
+                # 避免关联子查询触发events全表扫描，也不会误删同名不同日的事件
+                cursor.execute("SELECT title, date FROM policy_events WHERE id = ?", (event_id,))
+                row = cursor.fetchone()
+
                 # 从policy_events表删除
                 cursor.execute("DELETE FROM policy_events WHERE id = ?", (event_id,))
-                
-                # 从events表删除（通过标题匹配）
-                cursor.execute("""
-                    DELETE FROM events WHERE title IN (
-                        SELECT title FROM policy_events WHERE id = ?
+
+                if row:
+                    cursor.execute(
+                        "DELETE FROM events WHERE title = ? AND date = ?",
+                        (row['title'], row['date'])
                     )
-                """, (event_id,))
-                
+
                 conn.commit()
                 
             return {'success': True, 'message': '事件删除成功'}
@@ -178,47 +289,75 @@ class EventManager:
     
     def get_csv_template(self):
         """获取CSV导入模板"""
-        template_headers = [
-            'date',           # 日期 (必填, 格式: YYYY-MM-DD)
-            'title',          # 标题 (必填)
-            'source_url',     # 原文链接 (可选)
-            'content_type',   # 内容类型
-            'event_type',     # 事件类型
-            'department',     # 发布部门
-            'policy_level',   # 政策级别
-            'impact_level',   # 影响级别
-            'industries',     # 相关行业 (多个行业用逗号分隔)
-            'content',        # 内容
-            'ai_analysis'     # AI分析
-        ]
-        
-        # 创建示例数据
-        example_data = [
-            {
-                'date': '2024-01-15',
-                'title': '示例政策事件',
-                'source_url': 'https://example.com/policy-document',
-                'content_type': '政策文件',
-                'event_type': '货币政策',
-                'department': '央行',
-                'policy_level': '国家级',
-                'impact_level': '重大',
-                'industries': '银行,保险',
-                'content': '这是一个示例政策内容',
-                'ai_analysis': '这是AI分析结果'
-            }
-        ]
-        
-        # 生成CSV内容
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=template_headers)
-        writer.writeheader()
-        writer.writerows(example_data)
-        
-        return output.getvalue()
+        return _CSV_TEMPLATE_BYTES.decode('utf-8-sig')
+
+
+def _build_csv_template():
+    """生成CSV导入模板内容（仅模块加载时执行一次）"""
+    template_headers = [
+        'date',           # 日期 (必填, 格式: YYYY-MM-DD)
+        'title',          # 标题 (必填)
+        'source_url',     # 原文链接 (可选)
+        'content_type',   # 内容类型
+        'event_type',     # 事件类型
+        'department',     # 发布部门
+        'policy_level',   # 政策级别
+        'impact_level',   # 影响级别
+        'industries',     # 相关行业 (多个行业用逗号分隔)
+        'content',        # 内容
+        'ai_analysis'     # AI分析
+    ]
+
+    # 创建示例数据
+    example_data = [
+        {
+            'date': '2024-01-15',
+            'title': '示例政策事件',
+            'source_url': 'https://example.com/policy-document',
+            'content_type': '政策文件',
+            'event_type': '货币政策',
+            'department': '央行',
+            'policy_level': '国家级',
+            'impact_level': '重大',
+            'industries': '银行,保险',
+            'content': '这是一个示例政策内容',
+            'ai_analysis': '这是AI分析结果'
+        }
+    ]
+
+    # 生成CSV内容
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=template_headers)
+    writer.writeheader()
+    writer.writerows(example_data)
+
+    return output.getvalue()
+
+
+# 模板是静态内容，启动时编码一次（utf-8-sig带BOM方便Excel识别），
+# 下载接口直接下发字节串
+_CSV_TEMPLATE_BYTES = _build_csv_template().encode('utf-8-sig')
 
 # 创建全局实例
 event_manager = EventManager()
+atexit.register(event_manager.close_connections)
+
+# CSV导入在后台线程执行，避免大文件解析+写库期间占住WSGI工作进程；
+# 任务句柄按job_id保存，供状态查询接口轮询
+_import_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='csv-import')
+_import_jobs = {}
+
+
+def _run_import_job(tmp_path):
+    """后台导入任务：流式读取落盘的上传文件，结束后清理临时文件"""
+    try:
+        with open(tmp_path, 'r', encoding='utf-8-sig', newline='') as f:
+            return event_manager.import_events_from_stream(f)
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
 
 def register_event_routes(app):
     """注册事件管理相关的路由"""
@@ -247,14 +386,39 @@ def register_event_routes(app):
             if not file.filename.lower().endswith('.csv'):
                 return jsonify({'success': False, 'message': '只支持CSV文件'}), 400
             
-            # 读取文件内容
-            csv_content = file.read().decode('utf-8-sig')  # 支持带BOM的UTF-8
-            
-            result = event_manager.import_events_from_csv(csv_content)
-            return jsonify(result)
-            
+            # 分块落盘到临时文件而不是整体read()进内存，
+            # 后台线程再按行流式解析（open时用utf-8-sig兼容带BOM的UTF-8）
+            tmp_fd, tmp_path = tempfile.mkstemp(suffix='.csv')
+            with os.fdopen(tmp_fd, 'wb') as tmp_file:
+                file.save(tmp_file)
+
+            # 提交到后台线程处理，立刻返回job_id；
+            # 前端通过 /api/import-status/<job_id> 轮询结果
+            job_id = uuid.uuid4().hex
+            _import_jobs[job_id] = _import_executor.submit(_run_import_job, tmp_path)
+            return jsonify({'success': True, 'job_id': job_id, 'status': 'pending'}), 202
+
         except Exception as e:
             return jsonify({'success': False, 'message': f'导入失败: {str(e)}'}), 500
+
+    @app.route('/api/import-status/<job_id>')
+    def import_status(job_id):
+        """查询CSV导入任务状态API"""
+        future = _import_jobs.get(job_id)
+        if future is None:
+            return jsonify({'success': False, 'message': '任务不存在'}), 404
+
+        if not future.done():
+            return jsonify({'success': True, 'status': 'pending'})
+
+        try:
+            result = future.result()
+            # 任务完成后从表中移除，避免句柄堆积
+            _import_jobs.pop(job_id, None)
+            return jsonify({'success': True, 'status': 'finished', 'result': result})
+        except Exception as e:
+            _import_jobs.pop(job_id, None)
+            return jsonify({'success': False, 'status': 'failed', 'message': f'导入失败: {str(e)}'}), 500
     
     @app.route('/api/delete-event/<int:event_id>', methods=['DELETE'])
     def delete_event_api(event_id):
@@ -269,15 +433,15 @@ def register_event_routes(app):
     def download_template():
         """下载CSV模板"""
         try:
-            template_content = event_manager.get_csv_template()
-            
             from flask import Response
             return Response(
-                template_content,
+                _CSV_TEMPLATE_BYTES,
                 mimetype='text/csv',
                 headers={
                     'Content-Disposition': 'attachment; filename=event_import_template.csv',
-                    'Content-Type': 'text/csv; charset=utf-8'
+                    'Content-Type': 'text/csv; charset=utf-8',
+                    # 静态内容，允许浏览器缓存一天
+                    'Cache-Control': 'public, max-age=86400'
                 }
             )
         except Exception as e:
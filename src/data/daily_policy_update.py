@@ -6,15 +6,27 @@
 """
 
 from ..core.policy_data_fetcher import PolicyDataFetcher
+import atexit
 import logging
+import logging.handlers
 from datetime import datetime
 
 # 配置日志
+_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 文件日志经MemoryHandler缓冲批量落盘，ERROR及以上立即刷出
+_file_handler = logging.FileHandler('daily_policy_update.log', encoding='utf-8')
+_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+_buffered_handler = logging.handlers.MemoryHandler(
+    capacity=1024, flushLevel=logging.ERROR, target=_file_handler
+)
+atexit.register(_buffered_handler.close)
+
 logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    format=_LOG_FORMAT,
     handlers=[
-        logging.FileHandler('daily_policy_update.log', encoding='utf-8'),
+        _buffered_handler,
         logging.StreamHandler()
     ]
 )
@@ -6,17 +6,29 @@
 """
 
 from ..core.policy_data_fetcher import PolicyDataFetcher
+import atexit
 import logging
-import schedule
-import time
+import logging.handlers
+from apscheduler.schedulers.blocking import BlockingScheduler
 from datetime import datetime
 
 # 配置日志
+_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 文件日志套一层MemoryHandler做缓冲写入，避免长时间抓取中
+# 每条日志都触发write+flush系统调用；ERROR及以上立即落盘
+_file_handler = logging.FileHandler('policy_fetch.log', encoding='utf-8')
+_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+_buffered_handler = logging.handlers.MemoryHandler(
+    capacity=1024, flushLevel=logging.ERROR, target=_file_handler
+)
+atexit.register(_buffered_handler.close)
+
 logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    level=logging.INFO,
+    format=_LOG_FORMAT,
     handlers=[
-        logging.FileHandler('policy_fetch.log', encoding='utf-8'),
+        _buffered_handler,
         logging.StreamHandler()
     ]
 )
@@ -73,17 +85,10 @@ def fetch_specific_month_policies(target_month):
         logger.info("="*50)
         return 0
 
-def setup_daily_schedule():
-    """设置每天自动抓取任务"""
-    # 每天早上8点执行
-    schedule.every().day.at("08:00").do(fetch_latest_policies)
-    
-    # 每天下午2点执行
-    schedule.every().day.at("14:00").do(fetch_latest_policies)
-    
-    # 每天晚上8点执行
-    schedule.every().day.at("20:00").do(fetch_latest_policies)
-    
+def setup_daily_schedule(scheduler):
+    """设置每天自动抓取任务（每天08:00、14:00、20:00各执行一次）"""
+    scheduler.add_job(fetch_latest_policies, 'cron', hour='8,14,20', minute=0)
+
     logger.info("已设置每日自动抓取任务：")
     logger.info("- 每天 08:00 执行政策数据抓取")
     logger.info("- 每天 14:00 执行政策数据抓取")
@@ -92,19 +97,18 @@ def setup_daily_schedule():
 def run_scheduler():
     """运行调度器"""
     logger.info("政策数据自动抓取服务启动")
-    
+
     # 先执行一次立即抓取
     logger.info("执行初始抓取...")
     fetch_latest_policies()
-    
-    # 设置定时任务
-    setup_daily_schedule()
-    
-    # 持续运行调度器
+
+    # 设置定时任务：BlockingScheduler基于条件变量等到下一次触发点，
+    # 不再每60秒轮询唤醒一次
+    scheduler = BlockingScheduler()
+    setup_daily_schedule(scheduler)
+
     logger.info("开始监听定时任务...")
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # 每分钟检查一次
+    scheduler.start()
 
 def main():
     """主函数"""